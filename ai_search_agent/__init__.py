@@ -3,4 +3,19 @@ ai_search_agent package
 
 This package contains the core pipeline, prompt templates, and web operations
 for the Multi‑Source Research Agent.
+
+Set ``ASA_LOAD_DOTENV=1`` to load a ``.env`` file when the package is first
+imported, before any module reads its configuration from the environment.
+
+Bright Data request/polling progress is reported through the
+``ai_search_agent`` logger. Records propagate to the host application's
+logging setup; the CLI and the API server print them when the host has not
+configured logging (see ``cli.configure_logging``).
 """
+
+import os
+
+if os.getenv("ASA_LOAD_DOTENV") == "1":
+    from dotenv import load_dotenv
+
+    load_dotenv()
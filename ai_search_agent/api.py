@@ -3,41 +3,80 @@
 Endpoints:
 - GET /health: Simple health check
 - POST /api/research: Run research pipeline for a given question
+- POST /api/research/stream: Same, streaming the final answer as SSE
 """
 
+import asyncio
 import os
 import uuid
-from typing import Any, Dict, List, Optional
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Request, Response
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from .cli import configure_logging
 from .db import clear_runs as db_clear_runs
 from .db import create_share as db_create_share
 from .db import get_run as db_get_run
 from .db import get_shared as db_get_shared
-from .db import init_db
+from .db import close_db, init_db
 from .db import list_runs as db_list_runs
 from .db import save_run as db_save_run
-from .pipeline import run_research
+from .http_client import close_client
+from .pipeline import arun_analysis, arun_research, astream_synthesis
 from .preflight import preflight_check
 
-load_dotenv()
-init_db()
-
-app = FastAPI(title="AI Search Agent", version="0.1.0")
-
-# Enable CORS for local dev; adjust origins for production
+# Settings may live in Memcached (blocking client): call these via to_thread
+from .settings_store import get_settings as store_get_settings
+from .settings_store import set_settings as store_set_settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema setup runs once per server start, not on every import
+    init_db()
+    # Uvicorn only configures its own loggers; without this the package's
+    # progress and error records would not reach the server output.
+    configure_logging()
+    yield
+    close_client()
+    close_db()
+
+
+app = FastAPI(title="AI Search Agent", version="0.1.0", lifespan=lifespan)
+
+# Browsers reject credentialed CORS with a wildcard origin, so origins are
+# listed explicitly (comma-separated ASA_CORS_ORIGINS). Preflight responses
+# are cached for a day to avoid an extra OPTIONS round-trip per API call.
+CORS_ORIGINS = [
+    o.strip()
+    for o in os.getenv(
+        "ASA_CORS_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173"
+    ).split(",")
+    if o.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,
 )
 
 
+async def _sid_dep(request: Request) -> str:
+    # Populated for every HTTP request by SessionMiddleware
+    return request.scope["state"]["session_id"]
+
+
+SessionId = Annotated[str, Depends(_sid_dep)]
+
+
 class ResearchRequest(BaseModel):
     question: str = Field(..., description="User question to research")
     openai_api_key: str | None = Field(None, description="OpenAI API key")
@@ -62,118 +101,230 @@ class ResearchResponse(BaseModel):
 
 
 @app.get("/health")
-def health() -> Dict[str, str]:
+async def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+def _json_response(data: Any) -> Response:
+    # Run payloads carry large raw search results; orjson encodes them
+    # directly instead of going through jsonable_encoder + json.dumps.
+    return Response(content=orjson.dumps(data), media_type="application/json")
+
+
+async def _prepare_research(
+    payload: ResearchRequest, session_id: str
+) -> Tuple[Dict[str, Optional[str]], Optional[str]]:
+    """Resolve keys/datasets for a research request and run preflight.
+
+    Returns the pipeline config and the OpenAI key. Raises HTTPException(400)
+    when preflight fails.
+    """
+    # Merge session-stored settings with request payload
+    # Priority: payload value > session-stored value > None
+    session_settings = await asyncio.to_thread(store_get_settings, session_id)
+
+    openai_api_key = (
+        payload.openai_api_key
+        or session_settings.get("openai_api_key")
+        or os.getenv("OPENAI_API_KEY")
+    )
+    bda_key = (
+        payload.brightdata_api_key
+        or session_settings.get("brightdata_api_key")
+        or os.getenv("BRIGHTDATA_API_KEY")
+    )
+    reddit_ds = payload.reddit_dataset_id or session_settings.get("reddit_dataset_id")
+    reddit_comments_ds = payload.reddit_comments_dataset_id or session_settings.get(
+        "reddit_comments_dataset_id"
+    )
+
+    config = {
+        "brightdata_api_key": bda_key,
+        "reddit_dataset_id": reddit_ds,
+        "reddit_comments_dataset_id": reddit_comments_ds,
+    }
+    # Preflight checks before starting actual research
+    print("\n🔍 Received research request. Running preflight checks…")
+    pf = await asyncio.to_thread(
+        preflight_check,
+        openai_api_key=openai_api_key,
+        brightdata_api_key=bda_key,
+        reddit_dataset_id=reddit_ds,
+        reddit_comments_dataset_id=reddit_comments_ds,
+    )
+    if not pf.get("ok"):
+        # Summarize failures
+        parts = []
+        for k in (
+            "openai",
+            "brightdata_api",
+            "reddit_dataset",
+            "reddit_comments_dataset",
+        ):
+            r = pf.get(k) or {}
+            if not r.get("ok"):
+                parts.append(f"{k}: {r.get('message')}")
+        msg = "; ".join(parts) or "Preflight failed"
+        print(f"🚫 Aborting research due to preflight failure: {msg}")
+        raise HTTPException(status_code=400, detail=f"Preflight failed: {msg}")
+
+    print("🚀 Preflight passed. Starting research pipeline…")
+    return config, openai_api_key
+
+
 @app.post("/api/research", response_model=ResearchResponse)
-def research(payload: ResearchRequest, request: Request):
+async def research(payload: ResearchRequest, session_id: SessionId):
     try:
-        # Merge session-stored settings with request payload
-        # Priority: payload value > session-stored value > None
-        session_id = _get_session_id(request)
-        session_settings = SETTINGS_STORE.get(session_id, {})
-
-        openai_api_key = (
-            payload.openai_api_key
-            or session_settings.get("openai_api_key")
-            or os.getenv("OPENAI_API_KEY")
-        )
-        bda_key = (
-            payload.brightdata_api_key
-            or session_settings.get("brightdata_api_key")
-            or os.getenv("BRIGHTDATA_API_KEY")
-        )
-        reddit_ds = payload.reddit_dataset_id or session_settings.get(
-            "reddit_dataset_id"
-        )
-        reddit_comments_ds = payload.reddit_comments_dataset_id or session_settings.get(
-            "reddit_comments_dataset_id"
-        )
-
-        config = {
-            "brightdata_api_key": bda_key,
-            "reddit_dataset_id": reddit_ds,
-            "reddit_comments_dataset_id": reddit_comments_ds,
-        }
-        # Preflight checks before starting actual research
-        print("\n🔍 Received research request. Running preflight checks…")
-        pf = preflight_check(
-            openai_api_key=openai_api_key,
-            brightdata_api_key=bda_key,
-            reddit_dataset_id=reddit_ds,
-            reddit_comments_dataset_id=reddit_comments_ds,
-        )
-        if not pf.get("ok"):
-            # Summarize failures
-            parts = []
-            for k in (
-                "openai",
-                "brightdata_api",
-                "reddit_dataset",
-                "reddit_comments_dataset",
-            ):
-                r = pf.get(k) or {}
-                if not r.get("ok"):
-                    parts.append(f"{k}: {r.get('message')}")
-            msg = "; ".join(parts) or "Preflight failed"
-            print(f"🚫 Aborting research due to preflight failure: {msg}")
-            raise HTTPException(status_code=400, detail=f"Preflight failed: {msg}")
-
-        print("🚀 Preflight passed. Starting research pipeline…")
-        result = run_research(
+        config, openai_api_key = await _prepare_research(payload, session_id)
+        result = await arun_research(
             payload.question, config=config, openai_api_key=openai_api_key
         )
 
         # Sanitize pipeline output: keep only fields defined in the
-        # response model and ensure values are JSON-serializable.
-        safe_response = ResearchResponse(**result)
-        safe_payload = safe_response.model_dump(exclude_none=True)
+        # response model and ensure values are JSON-serializable. This is the
+        # only validation pass; the response bypasses response_model checks.
+        safe_payload = ResearchResponse(**result).model_dump(exclude_none=True)
+        # Serialize once; the same bytes are stored and sent to the client
+        blob = orjson.dumps(safe_payload)
 
         run_id = uuid.uuid4().hex
-        db_save_run(session_id, run_id, payload.question, safe_payload)
+        await asyncio.to_thread(
+            db_save_run,
+            session_id,
+            run_id,
+            payload.question,
+            blob,
+            bool(safe_payload.get("final_answer")),
+        )
+
+        return Response(content=blob, media_type="application/json")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+def _sse(data: Dict[str, Any]) -> bytes:
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+@app.post("/api/research/stream")
+async def research_stream(payload: ResearchRequest, session_id: SessionId):
+    """Run the pipeline and stream the final synthesis as Server-Sent Events.
 
-        return safe_response
+    Events, in order: ``{"result": {...}}`` with the per-source results and
+    analyses, ``{"delta": "..."}`` for each chunk of the final answer, then
+    ``{"done": true, "run_id": "..."}``. If synthesis fails part-way the last
+    event is ``{"error": "...", "run_id": "..."}`` instead. The run is saved
+    once the stream ends; the answer is kept only if synthesis completed.
+    """
+    try:
+        config, openai_api_key = await _prepare_research(payload, session_id)
+        state = await arun_analysis(
+            payload.question, config=config, openai_api_key=openai_api_key
+        )
+        partial = ResearchResponse(**state).model_dump(exclude_none=True)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
+    async def event_stream():
+        run_id = uuid.uuid4().hex
+        parts: List[str] = []
+        completed = False
+        try:
+            yield _sse({"result": partial})
+            try:
+                async for delta in astream_synthesis(state):
+                    parts.append(delta)
+                    yield _sse({"delta": delta})
+            except Exception as e:
+                print(f"❌ Synthesis failed: {e}")
+                yield _sse({"error": str(e), "run_id": run_id})
+                return
+            completed = True
+            yield _sse({"done": True, "run_id": run_id})
+        finally:
+            # A cut-off answer is not saved as one
+            final_answer = "".join(parts) if completed else ""
+            result = (
+                dict(partial, final_answer=final_answer) if final_answer else partial
+            )
+            await asyncio.to_thread(
+                db_save_run,
+                session_id,
+                run_id,
+                payload.question,
+                orjson.dumps(result),
+                bool(final_answer),
+            )
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 
-# --- Server-side session storage (in-memory) ---
+# --- Server-side session storage (see settings_store.py) ---
 SESSION_COOKIE = "ASA_SESSION"
-SETTINGS_STORE: Dict[str, Dict[str, Optional[str]]] = {}
 # Past research runs are persisted in SQLite (see db.py)
 
 
-@app.middleware("http")
-async def attach_session(request: Request, call_next):
-    # Ensure a session cookie exists; attach session id to request state
-    session_id = request.cookies.get(SESSION_COOKIE)
-    new_session = False
-    if not session_id:
-        session_id = uuid.uuid4().hex
-        new_session = True
-    request.state.session_id = session_id
-
-    # If the request body is JSON we want to attach
-    # session_id to the parsed payload later
-    response: Response = await call_next(request)
-    if new_session:
-        response.set_cookie(
-            SESSION_COOKIE,
-            session_id,
-            httponly=True,
-            samesite="lax",
-            secure=False,
-            max_age=60 * 60 * 24 * 7,
-        )
-    return response
+SESSION_MAX_AGE = 60 * 60 * 24 * 7
+
+
+def _read_session_cookie(headers) -> Optional[str]:
+    # Scan raw ASGI header tuples rather than building a Request object
+    prefix = SESSION_COOKIE + "="
+    for name, value in headers:
+        if name != b"cookie":
+            continue
+        for part in value.decode("latin-1").split(";"):
+            part = part.strip()
+            if part.startswith(prefix):
+                return part[len(prefix) :] or None
+    return None
+
+
+class SessionMiddleware:
+    """Pure ASGI middleware ensuring every HTTP request carries a session id.
+
+    The id is stored in ``scope["state"]`` (exposed as ``request.state``) and,
+    for new sessions, a cookie is appended to the response start message.
+    """
+
+    def __init__(self, app):
+        self.app = app
 
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-def _get_session_id(request: Request) -> str:
-    sid = getattr(request.state, "session_id", None)
-    if not sid:
-        raise HTTPException(status_code=400, detail="Missing session")
-    return sid
+        session_id = _read_session_cookie(scope.get("headers") or ())
+        new_session = session_id is None
+        if new_session:
+            session_id = uuid.uuid4().hex
+        scope.setdefault("state", {})["session_id"] = session_id
+
+        if not new_session:
+            await self.app(scope, receive, send)
+            return
+
+        cookie = (
+            f"{SESSION_COOKIE}={session_id}; HttpOnly; SameSite=lax; "
+            f"Max-Age={SESSION_MAX_AGE}; Path=/"
+        ).encode("latin-1")
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers") or [])
+                headers.append((b"set-cookie", cookie))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+app.add_middleware(SessionMiddleware)
 
 
 class SettingsPayload(BaseModel):
@@ -191,9 +342,8 @@ class SettingsMeta(BaseModel):
 
 
 @app.get("/api/settings", response_model=SettingsMeta)
-def get_settings(request: Request):
-    sid = _get_session_id(request)
-    cur = SETTINGS_STORE.get(sid, {})
+async def get_settings(sid: SessionId):
+    cur = await asyncio.to_thread(store_get_settings, sid)
     return SettingsMeta(
         has_openai_api_key=bool(cur.get("openai_api_key")),
         has_brightdata_api_key=bool(cur.get("brightdata_api_key")),
@@ -203,14 +353,14 @@ def get_settings(request: Request):
 
 
 @app.post("/api/settings", response_model=SettingsMeta)
-def save_settings(payload: SettingsPayload, request: Request):
-    sid = _get_session_id(request)
-    cur = SETTINGS_STORE.setdefault(sid, {})
+async def save_settings(payload: SettingsPayload, sid: SessionId):
+    cur = await asyncio.to_thread(store_get_settings, sid)
     # Update only provided values
     for key, value in payload.model_dump().items():
         if value is not None:
             cur[key] = value
-    return get_settings(request)
+    await asyncio.to_thread(store_set_settings, sid, cur)
+    return await get_settings(sid)
 
 
 class TestSettingsResponse(BaseModel):
@@ -223,10 +373,9 @@ class TestSettingsResponse(BaseModel):
 
 
 @app.post("/api/test-settings", response_model=TestSettingsResponse)
-def test_settings(payload: SettingsPayload, request: Request):
+async def test_settings(payload: SettingsPayload, sid: SessionId):
     # Run consolidated preflight using saved + provided settings
-    sid = _get_session_id(request)
-    cur = SETTINGS_STORE.get(sid, {})
+    cur = await asyncio.to_thread(store_get_settings, sid)
     bright = (
         payload.brightdata_api_key
         or cur.get("brightdata_api_key")
@@ -242,7 +391,8 @@ def test_settings(payload: SettingsPayload, request: Request):
         "reddit_comments_dataset_id"
     )
 
-    pf = preflight_check(
+    pf = await asyncio.to_thread(
+        preflight_check,
         openai_api_key=openai_key,
         brightdata_api_key=bright,
         reddit_dataset_id=reddit_ds,
@@ -300,25 +450,44 @@ class RunMeta(BaseModel):
     has_answer: bool
 
 
-@app.get("/api/runs", response_model=List[RunMeta])
-def list_runs(request: Request):
-    sid = _get_session_id(request)
-    return db_list_runs(sid)
+class RunPage(BaseModel):
+    items: List[RunMeta]
+    # Pass back as before_ts/before_id to fetch the next (older) page; null on
+    # the last page
+    next_before_ts: Optional[int] = None
+    next_before_id: Optional[str] = None
+
+
+@app.get("/api/runs", response_model=RunPage)
+async def list_runs(
+    sid: SessionId,
+    before_ts: Optional[int] = None,
+    before_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+):
+    items = await asyncio.to_thread(db_list_runs, sid, before_ts, before_id, limit)
+    last = items[-1] if len(items) == limit else None
+    # Rows come straight from SQLite in RunMeta shape; skip re-validation
+    return _json_response(
+        {
+            "items": items,
+            "next_before_ts": last["ts"] if last else None,
+            "next_before_id": last["id"] if last else None,
+        }
+    )
 
 
 @app.get("/api/runs/{run_id}")
-def get_run(run_id: str, request: Request):
-    sid = _get_session_id(request)
-    r = db_get_run(sid, run_id)
+async def get_run(run_id: str, sid: SessionId):
+    r = await asyncio.to_thread(db_get_run, sid, run_id)
     if not r:
         raise HTTPException(status_code=404, detail="Run not found")
-    return r
+    return _json_response(r)
 
 
 @app.delete("/api/runs")
-def clear_runs(request: Request):
-    sid = _get_session_id(request)
-    db_clear_runs(sid)
+async def clear_runs(sid: SessionId):
+    await asyncio.to_thread(db_clear_runs, sid)
     return {"ok": True}
 
 
@@ -328,20 +497,19 @@ class ShareResponse(BaseModel):
 
 
 @app.post("/api/runs/{run_id}/share", response_model=ShareResponse)
-def share_run(run_id: str, request: Request):
-    sid = _get_session_id(request)
-    r = db_get_run(sid, run_id)
+async def share_run(run_id: str, request: Request, sid: SessionId):
+    r = await asyncio.to_thread(db_get_run, sid, run_id)
     if not r:
         raise HTTPException(status_code=404, detail="Run not found")
     share_id = uuid.uuid4().hex
-    db_create_share(run_id, share_id)
+    await asyncio.to_thread(db_create_share, run_id, share_id)
     base = str(request.base_url).rstrip("/")
     return ShareResponse(share_id=share_id, url=f"{base}/api/share/{share_id}")
 
 
 @app.get("/api/share/{share_id}")
-def get_shared_run(share_id: str):
-    r = db_get_shared(share_id)
+async def get_shared_run(share_id: str):
+    r = await asyncio.to_thread(db_get_shared, share_id)
     if not r:
         raise HTTPException(status_code=404, detail="Shared run not found")
-    return r
+    return _json_response(r)
@@ -1,9 +1,48 @@
 """Console script entrypoint for the AI Search Agent."""
 
-from .pipeline import run_research
+import asyncio
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+
+
+def _use_uvloop() -> None:
+    """Run the pipeline's event loops on uvloop when it is installed."""
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+def configure_logging() -> None:
+    """Print the package's log records to stdout, like the CLI's own output.
+
+    The level comes from ``AI_SEARCH_LOG_LEVEL`` (default INFO). Does nothing
+    if the package or root logger already has handlers (a host logging config,
+    or an earlier call), so records are never printed twice.
+    """
+    log = logging.getLogger("ai_search_agent")
+    if log.handlers or logging.getLogger().handlers:
+        return
+    try:
+        log.setLevel(os.getenv("AI_SEARCH_LOG_LEVEL", "INFO").upper())
+    except ValueError:
+        log.setLevel(logging.INFO)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
 
 
 def main() -> None:
+    _use_uvloop()
+    # Load .env before importing the pipeline so module-level settings see it
+    load_dotenv()
+    configure_logging()
+    from .pipeline import run_research
+
     print("Multi-Source Research Agent (CLI)")
     print("Type 'exit' to quit\n")
 
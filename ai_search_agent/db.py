@@ -1,34 +1,131 @@
 import os
-import json
 import sqlite3
+import threading
 import time
 from typing import Any, Dict, List, Optional
 
+import orjson
+import zstandard
+
 DB_PATH = os.environ.get("ASA_DB_PATH", os.path.join(os.getcwd(), "asa.db"))
 
+# One process-wide connection shared by all threads; _LOCK serializes access.
+_LOCK = threading.Lock()
+_CONN: Optional[sqlite3.Connection] = None
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+# Statement text is kept constant so sqlite3's per-connection statement cache
+# reuses the compiled form instead of re-preparing on every call.
+_SQL_INSERT_RUN = (
+    "INSERT INTO runs (id, session_id, ts, question, result, has_answer) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+# ts has one-second resolution, so pages are keyed on (ts, id) to step
+# through runs that share a timestamp. The row-value comparison is the same as
+# "ts < ? OR (ts = ? AND id < ?)" but lets SQLite seek the index to the cursor.
+_SQL_LIST_RUNS = (
+    "SELECT id, ts, question, has_answer FROM runs WHERE session_id = ? "
+    "ORDER BY ts DESC, id DESC LIMIT ?"
+)
+_SQL_LIST_RUNS_BEFORE = (
+    "SELECT id, ts, question, has_answer FROM runs "
+    "WHERE session_id = ? AND (ts, id) < (?, ?) "
+    "ORDER BY ts DESC, id DESC LIMIT ?"
+)
+_SQL_GET_RUN = (
+    "SELECT id, ts, question, result FROM runs WHERE session_id = ? AND id = ?"
+)
+_SQL_CLEAR_RUNS = "DELETE FROM runs WHERE session_id = ?"
+_SQL_INSERT_SHARE = "INSERT INTO shares (share_id, run_id, created_at) VALUES (?, ?, ?)"
+_SQL_GET_SHARED = (
+    "SELECT r.id, r.ts, r.question, r.result "
+    "FROM shares s JOIN runs r ON s.run_id = r.id "
+    "WHERE s.share_id = ?"
+)
+
+# runs.result holds zstd-compressed JSON. Rows written before compression
+# are plain JSON (TEXT or BLOB) and are told apart by the zstd frame magic.
+# zstandard contexts are not safe to share between threads, so each thread
+# gets its own pair.
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_ZSTD_LEVEL = 3
+_zstd_local = threading.local()
+
+
+def _compressor() -> zstandard.ZstdCompressor:
+    c = getattr(_zstd_local, "c", None)
+    if c is None:
+        c = _zstd_local.c = zstandard.ZstdCompressor(level=_ZSTD_LEVEL)
+    return c
+
+
+def _decompressor() -> zstandard.ZstdDecompressor:
+    d = getattr(_zstd_local, "d", None)
+    if d is None:
+        d = _zstd_local.d = zstandard.ZstdDecompressor()
+    return d
+
+
+def _decode_result(raw: Any) -> Any:
+    if isinstance(raw, bytes) and raw.startswith(_ZSTD_MAGIC):
+        raw = _decompressor().decompress(raw)
+    return orjson.loads(raw)
+
+
+# Refresh planner statistics at most this often (seconds), piggybacking on
+# writes rather than running a background thread.
+_OPTIMIZE_INTERVAL = 60 * 60
+_last_optimize = 0.0
+
 
 def _get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Return the shared connection, opening it on first use.
+
+    Callers must hold ``_LOCK``.
+    """
+    global _CONN
+    if _CONN is None:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        _CONN = conn
+    return _CONN
 
 
 def init_db() -> None:
-    conn = _get_conn()
-    try:
-        c = conn.cursor()
-        c.execute(
+    with _LOCK:
+        conn = _get_conn()
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS runs (
                 id TEXT PRIMARY KEY,
                 session_id TEXT NOT NULL,
                 ts INTEGER NOT NULL,
                 question TEXT NOT NULL,
-                result TEXT NOT NULL
+                result TEXT NOT NULL,
+                has_answer INTEGER NOT NULL DEFAULT 0
             )
             """
         )
-        c.execute(
+        cols = {r["name"] for r in conn.execute("PRAGMA table_info(runs)")}
+        if "has_answer" not in cols:
+            # Databases created before has_answer existed: add and backfill once
+            conn.execute(
+                "ALTER TABLE runs ADD COLUMN has_answer INTEGER NOT NULL DEFAULT 0"
+            )
+            conn.execute(
+                "UPDATE runs SET has_answer = 1 WHERE json_valid(result) "
+                "AND COALESCE(json_extract(result, '$.final_answer'), '') <> ''"
+            )
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS shares (
                 share_id TEXT PRIMARY KEY,
@@ -37,125 +134,123 @@ def init_db() -> None:
             )
             """
         )
-        conn.commit()
-    finally:
-        conn.close()
+        # Serves the per-session history listing as an index range scan
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_runs_sid_ts_id "
+            "ON runs(session_id, ts DESC, id DESC)"
+        )
+        # Superseded by idx_runs_sid_ts_id
+        conn.execute("DROP INDEX IF EXISTS idx_runs_sid_ts")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_shares_run ON shares(run_id)")
+        _optimize(conn)
+
+
+def _optimize(conn: sqlite3.Connection) -> None:
+    global _last_optimize
+    conn.execute("PRAGMA analysis_limit=400")
+    conn.execute("PRAGMA optimize")
+    _last_optimize = time.monotonic()
+
+
+def close_db() -> None:
+    """Optimize and close the shared connection (reopened on next use)."""
+    global _CONN
+    with _LOCK:
+        if _CONN is not None:
+            _optimize(_CONN)
+            _CONN.close()
+            _CONN = None
 
 
 def save_run(
-    session_id: str, run_id: str, question: str, result: Dict[str, Any]
+    session_id: str,
+    run_id: str,
+    question: str,
+    result_json: bytes,
+    has_answer: bool,
 ) -> None:
-    conn = _get_conn()
-    try:
-        c = conn.cursor()
-        c.execute(
+    """Persist a run whose result is already JSON-encoded.
+
+    The JSON is zstd-compressed and stored as a BLOB.
+    """
+    blob = _compressor().compress(result_json)
+    with _LOCK:
+        conn = _get_conn()
+        conn.execute(
+            _SQL_INSERT_RUN,
             (
-                "INSERT INTO runs (id, session_id, ts, question, result) "
-                "VALUES (?, ?, ?, ?, ?)"
+                run_id,
+                session_id,
+                int(time.time()),
+                question,
+                blob,
+                int(has_answer),
             ),
-            (run_id, session_id, int(time.time()), question, json.dumps(result)),
         )
-        conn.commit()
-    finally:
-        conn.close()
+        if time.monotonic() - _last_optimize > _OPTIMIZE_INTERVAL:
+            _optimize(conn)
 
 
-def list_runs(session_id: str) -> List[Dict[str, Any]]:
-    conn = _get_conn()
-    try:
-        c = conn.cursor()
-        rows = c.execute(
-            (
-                "SELECT id, ts, question, result "
-                "FROM runs WHERE session_id = ? "
-                "ORDER BY ts DESC"
-            ),
-            (session_id,),
-        ).fetchall()
-        metas: List[Dict[str, Any]] = []
-        for r in rows:
-            try:
-                has_answer = bool(json.loads(r["result"]).get("final_answer"))
-            except Exception:
-                has_answer = False
-            metas.append(
-                {
-                    "id": r["id"],
-                    "ts": r["ts"],
-                    "question": r["question"],
-                    "has_answer": has_answer,
-                }
-            )
-        return metas
-    finally:
-        conn.close()
+def list_runs(
+    session_id: str,
+    before_ts: Optional[int] = None,
+    before_id: Optional[str] = None,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """Return up to ``limit`` runs, newest first, after the ``(ts, id)`` cursor.
+
+    Without ``before_id`` every run at ``before_ts`` is skipped.
+    """
+    if before_ts is None:
+        sql, params = _SQL_LIST_RUNS, (session_id, limit)
+    else:
+        # No id sorts below "", so a missing before_id means "ts < before_ts"
+        params = (session_id, before_ts, before_id or "", limit)
+        sql = _SQL_LIST_RUNS_BEFORE
+    with _LOCK:
+        rows = _get_conn().execute(sql, params).fetchall()
+    return [
+        {
+            "id": r["id"],
+            "ts": r["ts"],
+            "question": r["question"],
+            "has_answer": bool(r["has_answer"]),
+        }
+        for r in rows
+    ]
 
 
 def get_run(session_id: str, run_id: str) -> Optional[Dict[str, Any]]:
-    conn = _get_conn()
-    try:
-        c = conn.cursor()
-        row = c.execute(
-            (
-                "SELECT id, ts, question, result "
-                "FROM runs WHERE session_id = ? AND id = ?"
-            ),
-            (session_id, run_id),
-        ).fetchone()
-        if not row:
-            return None
-        return {
-            "id": row["id"],
-            "ts": row["ts"],
-            "question": row["question"],
-            "result": json.loads(row["result"]),
-        }
-    finally:
-        conn.close()
+    with _LOCK:
+        row = _get_conn().execute(_SQL_GET_RUN, (session_id, run_id)).fetchone()
+    if not row:
+        return None
+    return {
+        "id": row["id"],
+        "ts": row["ts"],
+        "question": row["question"],
+        "result": _decode_result(row["result"]),
+    }
 
 
 def clear_runs(session_id: str) -> None:
-    conn = _get_conn()
-    try:
-        c = conn.cursor()
-        c.execute("DELETE FROM runs WHERE session_id = ?", (session_id,))
-        conn.commit()
-    finally:
-        conn.close()
+    with _LOCK:
+        _get_conn().execute(_SQL_CLEAR_RUNS, (session_id,))
 
 
 def create_share(run_id: str, share_id: str) -> None:
-    conn = _get_conn()
-    try:
-        c = conn.cursor()
-        c.execute(
-            "INSERT INTO shares (share_id, run_id, created_at) VALUES (?, ?, ?)",
-            (share_id, run_id, int(time.time())),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    with _LOCK:
+        _get_conn().execute(_SQL_INSERT_SHARE, (share_id, run_id, int(time.time())))
 
 
 def get_shared(share_id: str) -> Optional[Dict[str, Any]]:
-    conn = _get_conn()
-    try:
-        c = conn.cursor()
-        row = c.execute(
-            (
-                "SELECT r.id, r.ts, r.question, r.result "
-                "FROM shares s JOIN runs r ON s.run_id = r.id "
-                "WHERE s.share_id = ?"
-            ),
-            (share_id,),
-        ).fetchone()
-        if not row:
-            return None
-        return {
-            "id": row["id"],
-            "ts": row["ts"],
-            "question": row["question"],
-            "result": json.loads(row["result"]),
-        }
-    finally:
-        conn.close()
+    with _LOCK:
+        row = _get_conn().execute(_SQL_GET_SHARED, (share_id,)).fetchone()
+    if not row:
+        return None
+    return {
+        "id": row["id"],
+        "ts": row["ts"],
+        "question": row["question"],
+        "result": _decode_result(row["result"]),
+    }
@@ -0,0 +1,93 @@
+"""Shared HTTP client for outbound Bright Data requests.
+
+Reusing one ``httpx.Client`` keeps the TLS connection to api.brightdata.com
+alive across the SERP, trigger, progress and download calls of a research
+run. With HTTP/2 the concurrent calls from the pipeline's worker threads are
+multiplexed over that connection instead of each opening its own socket.
+"""
+
+import atexit
+import os
+import threading
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import httpx
+
+# Seconds before an outbound request is abandoned
+DEFAULT_TIMEOUT = 30
+
+# Idle connections kept open for reuse
+KEEPALIVE_CONNECTIONS = 16
+
+# Connection attempts retried by the transport (connect errors only, so the
+# request was never sent; status based retries live in web_operations)
+CONNECT_RETRIES = 3
+
+# Bright Data key from the environment, read once at import (entry points
+# load .env before importing this package's modules). Explicit per-session
+# keys passed by callers take precedence.
+_DEFAULT_BD_KEY: Optional[str] = os.getenv("BRIGHTDATA_API_KEY")
+
+_client: Optional[httpx.Client] = None
+_lock = threading.Lock()
+
+
+def _transport_options() -> dict:
+    return {
+        "http2": True,
+        "retries": CONNECT_RETRIES,
+        "limits": httpx.Limits(max_keepalive_connections=KEEPALIVE_CONNECTIONS),
+    }
+
+
+def get_client() -> httpx.Client:
+    """Return the process-wide client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                transport = httpx.HTTPTransport(**_transport_options())
+                _client = httpx.Client(transport=transport, timeout=DEFAULT_TIMEOUT)
+    return _client
+
+
+def new_async_client() -> httpx.AsyncClient:
+    """Return a new AsyncClient with the same transport settings.
+
+    AsyncClients are bound to the event loop they are used on, so callers
+    create one per loop (use it as ``async with``) instead of sharing one.
+    """
+    transport = httpx.AsyncHTTPTransport(**_transport_options())
+    return httpx.AsyncClient(transport=transport, timeout=DEFAULT_TIMEOUT)
+
+
+def close_client() -> None:
+    """Close pooled connections; a later get_client() starts a new pool."""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+@lru_cache(maxsize=8)
+def bd_headers(api_key: Optional[str], json_body: bool = False) -> Mapping[str, str]:
+    """Bright Data request headers for ``api_key``, built once per key.
+
+    The mapping is read-only because the same object is reused across calls.
+    """
+    headers = {"Authorization": f"Bearer {api_key}", "Accept": "application/json"}
+    if json_body:
+        headers["Content-Type"] = "application/json"
+    return MappingProxyType(headers)
+
+
+def _refresh_env() -> None:
+    """Re-read BRIGHTDATA_API_KEY (for tests or a late-loaded .env)."""
+    global _DEFAULT_BD_KEY
+    _DEFAULT_BD_KEY = os.getenv("BRIGHTDATA_API_KEY")
+
+
+atexit.register(close_client)
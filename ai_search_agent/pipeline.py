@@ -1,29 +1,60 @@
 """Research pipeline orchestration using LangGraph.
 
 This module wires together search (Google, Bing, Reddit), post retrieval,
-LLM-based analysis for each source, and final synthesis into a single
+a single LLM call analyzing all sources, and final synthesis into a single
 callable function for API and CLI usage.
 """
 
-from typing import Annotated, Dict, List, Optional, TypedDict
+from typing import Annotated, AsyncIterator, Dict, List, Optional, TypedDict
 
+import asyncio
+import functools
+import hashlib
 import os
-from dotenv import load_dotenv
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+from cachetools import TTLCache
 from langchain.chat_models import init_chat_model
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
 from pydantic import BaseModel, Field
 
 from .prompts import (
-    get_bing_analysis_messages,
-    get_google_analysis_messages,
-    get_reddit_analysis_messages,
+    get_combined_analysis_messages,
     get_reddit_url_analysis_messages,
     get_synthesis_messages,
 )
 from .web_operations import reddit_post_retrieval, reddit_search_api, serp_search
 
-load_dotenv()
+# Completed runs keyed by (normalized question, config); a hit skips all
+# SERP, dataset and LLM calls.
+_RESULT_CACHE: TTLCache = TTLCache(
+    maxsize=int(os.getenv("ASA_CACHE_MAX", "512")),
+    ttl=int(os.getenv("ASA_CACHE_TTL", "3600")),
+)
+_RESULT_CACHE_LOCK = threading.Lock()
+
+# Bright Data helpers block a thread for as long as a snapshot takes (up to
+# minutes of polling). They get their own pool so asyncio's default executor,
+# which serves the API's SQLite and settings calls, never queues behind them.
+_BD_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ASA_BD_WORKERS", "32")),
+    thread_name_prefix="brightdata",
+)
+
+
+async def _run_bd(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_BD_POOL, functools.partial(fn, *args, **kwargs))
+
+
+def _result_cache_key(question: str, config: Optional[dict]) -> bytes:
+    raw = orjson.dumps(
+        [question.strip().lower(), config or {}], option=orjson.OPT_SORT_KEYS
+    )
+    return hashlib.blake2b(raw, digest_size=16).digest()
 
 
 def _init_llm(openai_api_key: str | None = None):
@@ -62,12 +93,25 @@ class RedditURLAnalysis(BaseModel):
     )
 
 
-def google_search(state: State):
+class ThreeWayAnalysis(BaseModel):
+    """Structured output holding one analysis per source."""
+
+    google_analysis: str = Field(description="Analysis of the Google results")
+    bing_analysis: str = Field(description="Analysis of the Bing results")
+    reddit_analysis: str = Field(
+        description="Analysis of the Reddit posts and comments"
+    )
+
+
+async def google_search(state: State):
     user_question = state.get("user_question", "") or ""
     print(f"🔎 Google: searching for → {user_question}")
     cfg = state.get("config") or {}
-    google_results = serp_search(
-        user_question, engine="google", api_key=cfg.get("brightdata_api_key")
+    google_results = await _run_bd(
+        serp_search,
+        user_question,
+        engine="google",
+        api_key=cfg.get("brightdata_api_key"),
     )
     try:
         n = len((google_results or {}).get("organic", []))
@@ -77,12 +121,15 @@ def google_search(state: State):
     return {"google_results": google_results}
 
 
-def bing_search(state: State):
+async def bing_search(state: State):
     user_question = state.get("user_question", "") or ""
     print(f"🔎 Bing: searching for → {user_question}")
     cfg = state.get("config") or {}
-    bing_results = serp_search(
-        user_question, engine="bing", api_key=cfg.get("brightdata_api_key")
+    bing_results = await _run_bd(
+        serp_search,
+        user_question,
+        engine="bing",
+        api_key=cfg.get("brightdata_api_key"),
     )
     try:
         n = len((bing_results or {}).get("organic", []))
@@ -92,11 +139,12 @@ def bing_search(state: State):
     return {"bing_results": bing_results}
 
 
-def reddit_search(state: State):
+async def reddit_search(state: State):
     user_question = state.get("user_question", "") or ""
     print(f"🔎 Reddit: searching for → {user_question}")
     cfg = state.get("config") or {}
-    reddit_results = reddit_search_api(
+    reddit_results = await _run_bd(
+        reddit_search_api,
         keyword=user_question,
         api_key=cfg.get("brightdata_api_key"),
         dataset_id=cfg.get("reddit_dataset_id"),
@@ -109,7 +157,7 @@ def reddit_search(state: State):
     return {"reddit_results": reddit_results}
 
 
-def analyze_reddit_posts(state: State):
+async def analyze_reddit_posts(state: State):
     user_question = state.get("user_question", "") or ""
     reddit_results = state.get("reddit_results")
     if not reddit_results:
@@ -119,7 +167,7 @@ def analyze_reddit_posts(state: State):
     messages = get_reddit_url_analysis_messages(user_question, reddit_results)
 
     try:
-        analysis = structured_llm.invoke(messages)
+        analysis = await structured_llm.ainvoke(messages)
         selected_urls = analysis.selected_urls
         print("🔗 Selected Reddit URLs:")
         for i, url in enumerate(selected_urls, 1):
@@ -131,21 +179,31 @@ def analyze_reddit_posts(state: State):
     return {"selected_reddit_urls": selected_urls}
 
 
-def retrieve_reddit_posts(state: State):
+async def retrieve_reddit_posts(state: State):
+    """Fetch comments for the selected posts with a single retrieval call.
+
+    Every Bright Data trigger costs a snapshot and its own polling loop, so
+    URLs must not be fanned out one per call: reddit_post_retrieval packs
+    them into as few triggers as possible and polls those concurrently.
+    """
     print("🧵 Retrieving Reddit post comments…")
-    selected_urls = state.get("selected_reddit_urls", []) or []
+    # The LLM sometimes selects the same post twice; fetch it once
+    selected_urls = list(dict.fromkeys(state.get("selected_reddit_urls", []) or []))
     if not selected_urls:
         return {"reddit_post_data": []}
 
     print(f"📥 Processing {len(selected_urls)} Reddit URLs")
     cfg = state.get("config") or {}
-    reddit_post_data = reddit_post_retrieval(
+    result = await _run_bd(
+        reddit_post_retrieval,
         selected_urls,
         api_key=cfg.get("brightdata_api_key"),
         comments_dataset_id=cfg.get("reddit_comments_dataset_id"),
     )
-    if reddit_post_data:
-        print(f"✅ Retrieved {len(reddit_post_data)} posts")
+    comments = (result or {}).get("comments", [])
+    if comments:
+        reddit_post_data = {"comments": comments, "total_retrieved": len(comments)}
+        print(f"✅ Retrieved {len(comments)} comments")
     else:
         print("❌ Failed to get post data")
         reddit_post_data = []
@@ -153,50 +211,40 @@ def retrieve_reddit_posts(state: State):
     return {"reddit_post_data": reddit_post_data}
 
 
-def analyze_google_results(state: State):
-    print("🧠 Analyzing Google results…")
-    user_question = state.get("user_question", "") or ""
-    google_results = state.get("google_results", "")
-    messages = get_google_analysis_messages(user_question, google_results)
-    llm = state.get("llm")
-    reply = llm.invoke(messages)  # type: ignore[attr-defined]
-    return {"google_analysis": reply.content}
-
-
-def analyze_bing_results(state: State):
-    print("🧠 Analyzing Bing results…")
+async def analyze_all(state: State):
+    print("🧠 Analyzing Google, Bing and Reddit results…")
     user_question = state.get("user_question", "") or ""
-    bing_results = state.get("bing_results", "")
-    messages = get_bing_analysis_messages(user_question, bing_results)
+    messages = get_combined_analysis_messages(
+        user_question,
+        state.get("google_results", ""),
+        state.get("bing_results", ""),
+        state.get("reddit_results", ""),
+        state.get("reddit_post_data", ""),
+    )
     llm = state.get("llm")
-    reply = llm.invoke(messages)  # type: ignore[attr-defined]
-    return {"bing_analysis": reply.content}
+    structured_llm = llm.with_structured_output(ThreeWayAnalysis)
+    analysis = await structured_llm.ainvoke(messages)
+    return {
+        "google_analysis": analysis.google_analysis,
+        "bing_analysis": analysis.bing_analysis,
+        "reddit_analysis": analysis.reddit_analysis,
+    }
 
 
-def analyze_reddit_results(state: State):
-    print("🧠 Analyzing Reddit results…")
-    user_question = state.get("user_question", "") or ""
-    reddit_results = state.get("reddit_results", "")
-    reddit_post_data = state.get("reddit_post_data", "")
-    messages = get_reddit_analysis_messages(
-        user_question, reddit_results, reddit_post_data
+def _synthesis_messages(state: State) -> list:
+    return get_synthesis_messages(
+        state.get("user_question", "") or "",
+        state.get("google_analysis", ""),
+        state.get("bing_analysis", ""),
+        state.get("reddit_analysis", ""),
     )
-    llm = state.get("llm")
-    reply = llm.invoke(messages)  # type: ignore[attr-defined]
-    return {"reddit_analysis": reply.content}
 
 
-def synthesize_analyses(state: State):
+async def synthesize_analyses(state: State):
     print("🧪 Synthesizing analyses into a final answer…")
-    user_question = state.get("user_question", "") or ""
-    google_analysis = state.get("google_analysis", "")
-    bing_analysis = state.get("bing_analysis", "")
-    reddit_analysis = state.get("reddit_analysis", "")
-    messages = get_synthesis_messages(
-        user_question, google_analysis, bing_analysis, reddit_analysis
-    )
+    messages = _synthesis_messages(state)
     llm = state.get("llm")
-    reply = llm.invoke(messages)  # type: ignore[attr-defined]
+    reply = await llm.ainvoke(messages)  # type: ignore[attr-defined]
     final_answer = reply.content
     print("🏁 Synthesis complete.")
     return {
@@ -205,18 +253,20 @@ def synthesize_analyses(state: State):
     }
 
 
-def build_graph() -> StateGraph:
-    """Build and compile the LangGraph state machine for the pipeline."""
+def build_graph(include_synthesis: bool = True) -> StateGraph:
+    """Build and compile the LangGraph state machine for the pipeline.
+
+    Args:
+        include_synthesis: When False the graph stops after the per-source
+            analyses so the synthesis can be streamed separately.
+    """
     graph_builder = StateGraph(State)
     graph_builder.add_node("google_search", google_search)
     graph_builder.add_node("bing_search", bing_search)
     graph_builder.add_node("reddit_search", reddit_search)
     graph_builder.add_node("analyze_reddit_posts", analyze_reddit_posts)
     graph_builder.add_node("retrieve_reddit_posts", retrieve_reddit_posts)
-    graph_builder.add_node("analyze_google_results", analyze_google_results)
-    graph_builder.add_node("analyze_bing_results", analyze_bing_results)
-    graph_builder.add_node("analyze_reddit_results", analyze_reddit_results)
-    graph_builder.add_node("synthesize_analyses", synthesize_analyses)
+    graph_builder.add_node("analyze_all", analyze_all)
 
     graph_builder.add_edge(START, "google_search")
     graph_builder.add_edge(START, "bing_search")
@@ -227,41 +277,24 @@ def build_graph() -> StateGraph:
     graph_builder.add_edge("reddit_search", "analyze_reddit_posts")
     graph_builder.add_edge("analyze_reddit_posts", "retrieve_reddit_posts")
 
-    graph_builder.add_edge("retrieve_reddit_posts", "analyze_google_results")
-    graph_builder.add_edge("retrieve_reddit_posts", "analyze_bing_results")
-    graph_builder.add_edge("retrieve_reddit_posts", "analyze_reddit_results")
-
-    graph_builder.add_edge("analyze_google_results", "synthesize_analyses")
-    graph_builder.add_edge("analyze_bing_results", "synthesize_analyses")
-    graph_builder.add_edge("analyze_reddit_results", "synthesize_analyses")
+    graph_builder.add_edge("retrieve_reddit_posts", "analyze_all")
 
-    graph_builder.add_edge("synthesize_analyses", END)
+    if include_synthesis:
+        graph_builder.add_node("synthesize_analyses", synthesize_analyses)
+        graph_builder.add_edge("analyze_all", "synthesize_analyses")
+        graph_builder.add_edge("synthesize_analyses", END)
+    else:
+        graph_builder.add_edge("analyze_all", END)
     return graph_builder.compile()
 
 
 # Compile once at import time for reuse.
 graph = build_graph()
+analysis_graph = build_graph(include_synthesis=False)
 
 
-def run_research(
-    question: str,
-    config: Optional[dict] = None,
-    *,
-    openai_api_key: str | None = None,
-    llm_override: object | None = None,
-) -> Dict[str, object]:
-    """Run the full research pipeline and return results.
-
-    Args:
-        question: User question to research.
-
-    Returns:
-        Dict containing final answer and intermediate artifacts.
-    """
-    print(f"\n🚀 Starting research for: {question}")
-    llm = llm_override or _init_llm(openai_api_key)
-
-    init_state: State = {
+def _initial_state(question: str, config: Optional[dict], llm: object) -> State:
+    return {
         "messages": [{"role": "user", "content": question}],
         "user_question": question,
         "google_results": None,
@@ -277,6 +310,97 @@ def run_research(
         "llm": llm,
     }
 
-    final_state = graph.invoke(init_state)
+
+# A source that returned None failed (timeout, upstream error, open circuit);
+# answers built without it are not worth serving to later callers.
+_REQUIRED_SOURCES = ("google_results", "bing_results", "reddit_results")
+
+
+def _cacheable(state: Dict) -> bool:
+    return bool(state.get("final_answer")) and all(
+        state.get(source) is not None for source in _REQUIRED_SOURCES
+    )
+
+
+async def arun_research(
+    question: str,
+    config: Optional[dict] = None,
+    *,
+    openai_api_key: str | None = None,
+    llm_override: object | None = None,
+) -> Dict[str, object]:
+    """Run the full research pipeline on the current event loop.
+
+    Search branches and per-source analyses run concurrently; blocking
+    Bright Data calls are offloaded to worker threads. Answered questions are
+    cached for ``ASA_CACHE_TTL`` seconds (default one hour) when every search
+    source returned results.
+
+    Args:
+        question: User question to research.
+
+    Returns:
+        Dict containing final answer and intermediate artifacts.
+    """
+    key = _result_cache_key(question, config)
+    with _RESULT_CACHE_LOCK:
+        cached = _RESULT_CACHE.get(key)
+    if cached is not None:
+        print(f"\n♻️ Returning cached research for: {question}")
+        return dict(cached)
+
+    print(f"\n🚀 Starting research for: {question}")
+    llm = llm_override or _init_llm(openai_api_key)
+    final_state = await graph.ainvoke(_initial_state(question, config, llm))
     print("✨ Research pipeline finished.\n")
+    if _cacheable(final_state):
+        # Don't keep the LLM client alive in the cache
+        entry = {k: v for k, v in final_state.items() if k != "llm"}
+        with _RESULT_CACHE_LOCK:
+            _RESULT_CACHE[key] = entry
     return final_state
+
+
+async def arun_analysis(
+    question: str,
+    config: Optional[dict] = None,
+    *,
+    openai_api_key: str | None = None,
+    llm_override: object | None = None,
+) -> Dict[str, object]:
+    """Run search, retrieval and per-source analysis, without synthesis.
+
+    Pass the returned state to :func:`astream_synthesis` to stream the
+    final answer.
+    """
+    print(f"\n🚀 Starting research for: {question}")
+    llm = llm_override or _init_llm(openai_api_key)
+    return await analysis_graph.ainvoke(_initial_state(question, config, llm))
+
+
+async def astream_synthesis(state: Dict[str, object]) -> AsyncIterator[str]:
+    """Yield the final answer text chunk by chunk as the LLM produces it."""
+    print("🧪 Streaming synthesis of analyses…")
+    llm = state.get("llm")
+    async for chunk in llm.astream(_synthesis_messages(state)):  # type: ignore
+        if chunk.content:
+            yield chunk.content
+    print("🏁 Synthesis complete.")
+
+
+def run_research(
+    question: str,
+    config: Optional[dict] = None,
+    *,
+    openai_api_key: str | None = None,
+    llm_override: object | None = None,
+) -> Dict[str, object]:
+    """Synchronous wrapper around :func:`arun_research` for CLI usage."""
+    return asyncio.run(
+        arun_research(
+            question,
+            config,
+            openai_api_key=openai_api_key,
+            llm_override=llm_override,
+        )
+    )
@@ -1,27 +1,71 @@
+import asyncio
+import hashlib
+import threading
 from typing import Dict, Optional
-import requests
+
+import httpx
+import orjson
+from cachetools import TTLCache
+
+from .http_client import bd_headers, new_async_client
+
+# Successful key checks are remembered briefly so repeated preflights (every
+# research call and /api/test-settings) don't re-probe upstream. Entries are
+# keyed by a hash of the key so raw secrets never sit in the cache; failures
+# are not cached so a fixed key is picked up immediately.
+PREFLIGHT_CACHE_TTL = 300
+_preflight_cache: TTLCache = TTLCache(maxsize=256, ttl=PREFLIGHT_CACHE_TTL)
+_preflight_cache_lock = threading.Lock()
 
 
 def _bool(val: Optional[str]) -> bool:
     return bool(val and val.strip())
 
 
-def check_openai(key: Optional[str], timeout: int = 6) -> Dict[str, object]:
+def _cache_key(service: str, key: str) -> str:
+    return f"{service}:{hashlib.blake2b(key.encode(), digest_size=8).hexdigest()}"
+
+
+def _cached(cache_key: str) -> Optional[Dict[str, object]]:
+    with _preflight_cache_lock:
+        return _preflight_cache.get(cache_key)
+
+
+def _remember(cache_key: str, result: Dict[str, object]) -> Dict[str, object]:
+    if result["ok"]:
+        with _preflight_cache_lock:
+            _preflight_cache[cache_key] = result
+    return result
+
+
+async def check_openai(
+    client: httpx.AsyncClient, key: Optional[str], timeout: int = 6
+) -> Dict[str, object]:
     """Lightweight OpenAI key validation using the models endpoint.
 
     Does not consume completion tokens. Returns dict with ok + message.
     """
     if not _bool(key):
         return {"ok": False, "message": "Missing OpenAI API key"}
+    cache_key = _cache_key("openai", key)
+    cached = _cached(cache_key)
+    if cached is not None:
+        return cached
+    return _remember(cache_key, await _probe_openai(client, key, timeout))
+
+
+async def _probe_openai(
+    client: httpx.AsyncClient, key: str, timeout: int
+) -> Dict[str, object]:
     try:
-        resp = requests.get(
+        resp = await client.get(
             "https://api.openai.com/v1/models",
             headers={"Authorization": f"Bearer {key}"},
             timeout=timeout,
         )
         if resp.status_code == 200:
             try:
-                data = resp.json()
+                data = orjson.loads(resp.content)
                 ids = {
                     str(m.get("id"))
                     for m in (data.get("data") or [])
@@ -43,24 +87,33 @@ def check_openai(key: Optional[str], timeout: int = 6) -> Dict[str, object]:
         return {"ok": False, "message": f"OpenAI check error: {e}"}
 
 
-def _bd_get(url: str, token: str, timeout: int):
-    return requests.get(
+async def _bd_get(client: httpx.AsyncClient, url: str, token: str, timeout: int):
+    return await client.get(
         url,
-        headers={
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-        },
+        headers=bd_headers(token),
         timeout=timeout,
     )
 
 
-def check_brightdata_token(token: Optional[str], timeout: int = 8) -> Dict[str, object]:
+async def check_brightdata_token(
+    client: httpx.AsyncClient, token: Optional[str], timeout: int = 8
+) -> Dict[str, object]:
     if not _bool(token):
         return {"ok": False, "message": "Missing Bright Data token"}
+    cache_key = _cache_key("brightdata", token)
+    cached = _cached(cache_key)
+    if cached is not None:
+        return cached
+    return _remember(cache_key, await _probe_brightdata(client, token, timeout))
+
+
+async def _probe_brightdata(
+    client: httpx.AsyncClient, token: str, timeout: int
+) -> Dict[str, object]:
     try:
         # The stable token probe is the legacy list endpoint
         u = "https://api.brightdata.com/datasets/list?page=1"
-        resp = _bd_get(u, token, timeout)
+        resp = await _bd_get(client, u, token, timeout)
         try:
             print(f"   [preflight] Bright Data token check {resp.status_code} @ {u}")
         except Exception:
@@ -83,12 +136,24 @@ def check_brightdata_dataset_exists(
     if not _bool(dataset_id):
         return {"ok": False, "message": "Missing dataset id"}
     # We avoid heavy/triggering API calls; validate format only.
-    ds = str(dataset_id)
-    if ds.startswith("gd_") and len(ds) >= 6:
+    ds = dataset_id if type(dataset_id) is str else str(dataset_id)
+    if len(ds) >= 6 and ds.startswith("gd_"):
         return {"ok": True, "message": "Looks valid (format check)"}
     return {"ok": False, "message": "Dataset id format looks unusual"}
 
 
+async def _check_remote(
+    openai_api_key: Optional[str], brightdata_api_key: Optional[str]
+):
+    # One client per run so both probes share its connection pool; a
+    # module-level AsyncClient would be bound to a single event loop.
+    async with new_async_client() as client:
+        return await asyncio.gather(
+            check_openai(client, openai_api_key),
+            check_brightdata_token(client, brightdata_api_key),
+        )
+
+
 def preflight_check(
     *,
     openai_api_key: Optional[str],
@@ -104,11 +169,11 @@ def preflight_check(
 
     results: Dict[str, object] = {}
 
-    r_openai = check_openai(openai_api_key)
+    # Network probes run concurrently; dataset checks are local format checks
+    r_openai, r_bright = asyncio.run(_check_remote(openai_api_key, brightdata_api_key))
     print(f"   🤖 OpenAI: {'OK' if r_openai['ok'] else 'FAIL'} — {r_openai['message']}")
     results["openai"] = r_openai
 
-    r_bright = check_brightdata_token(brightdata_api_key)
     print(
         (
             "   🌐 Bright Data API: "
@@ -119,6 +119,41 @@ class PromptTemplates:
             "user experiences, and relevant discussions."
         )
 
+    @staticmethod
+    def combined_analysis_system() -> str:
+        """System prompt for analyzing all three sources in a single call."""
+        return (
+            "You will analyze Google, Bing, and Reddit results for the same "
+            "question in one pass and return a separate analysis for each "
+            "source. Follow the instructions given for each source.\n\n"
+            "## Google analysis\n"
+            f"{PromptTemplates.google_analysis_system()}\n\n"
+            "## Bing analysis\n"
+            f"{PromptTemplates.bing_analysis_system()}\n\n"
+            "## Reddit analysis\n"
+            f"{PromptTemplates.reddit_analysis_system()}"
+        )
+
+    @staticmethod
+    def combined_analysis_user(
+        user_question: str,
+        google_results: str,
+        bing_results: str,
+        reddit_results: str,
+        reddit_post_data: list,
+    ) -> str:
+        """User prompt for analyzing all three sources in a single call."""
+        return (
+            "## Google\n"
+            f"{PromptTemplates.google_analysis_user(user_question, google_results)}"
+            "\n\n## Bing\n"
+            f"{PromptTemplates.bing_analysis_user(user_question, bing_results)}"
+            "\n\n## Reddit\n"
+            + PromptTemplates.reddit_analysis_user(
+                user_question, reddit_results, reddit_post_data
+            )
+        )
+
     @staticmethod
     def synthesis_system() -> str:
         """System prompt for synthesizing all analyses."""
@@ -214,6 +249,26 @@ def get_reddit_analysis_messages(
     )
 
 
+def get_combined_analysis_messages(
+    user_question: str,
+    google_results: str,
+    bing_results: str,
+    reddit_results: str,
+    reddit_post_data: list,
+) -> list[Dict[str, Any]]:
+    """Get messages for analyzing Google, Bing, and Reddit in one call."""
+    return create_message_pair(
+        PromptTemplates.combined_analysis_system(),
+        PromptTemplates.combined_analysis_user(
+            user_question,
+            google_results,
+            bing_results,
+            reddit_results,
+            reddit_post_data,
+        ),
+    )
+
+
 def get_synthesis_messages(
     user_question: str, google_analysis: str, bing_analysis: str, reddit_analysis: str
 ) -> list[Dict[str, Any]]:
@@ -0,0 +1,84 @@
+"""Server-side storage for per-session settings (API keys, dataset ids).
+
+By default settings live in a bounded in-process TTL cache. Set
+``ASA_CACHE_URL`` (e.g. ``memcache://host1:11211,host2:11211``) to keep them
+in Memcached instead so every worker sees the same settings; keys are spread
+across the listed servers with consistent hashing.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from cachetools import TTLCache
+
+Settings = Dict[str, Optional[str]]
+
+SETTINGS_TTL = 7 * 24 * 60 * 60
+SETTINGS_MAX_SESSIONS = 10_000
+
+
+class _LocalStore:
+    def __init__(self, maxsize: int, ttl: int) -> None:
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Settings:
+        with self._lock:
+            return dict(self._cache.get(session_id) or {})
+
+    def set(self, session_id: str, settings: Settings) -> None:
+        with self._lock:
+            self._cache[session_id] = dict(settings)
+
+
+class _MemcacheStore:
+    def __init__(self, url: str, ttl: int) -> None:
+        try:
+            from pymemcache.client.hash import HashClient
+        except ImportError as e:  # pragma: no cover - optional dependency
+            raise RuntimeError(
+                "ASA_CACHE_URL requires pymemcache; install ai-search-agent[memcache]"
+            ) from e
+
+        servers = []
+        for node in urlparse(url).netloc.split(","):
+            host, _, port = node.partition(":")
+            servers.append((host, int(port or 11211)))
+        self._client = HashClient(servers, connect_timeout=1, timeout=1)
+        self._ttl = ttl
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"asa:settings:{session_id}"
+
+    def get(self, session_id: str) -> Settings:
+        raw = self._client.get(self._key(session_id))
+        return json.loads(raw) if raw else {}
+
+    def set(self, session_id: str, settings: Settings) -> None:
+        self._client.set(
+            self._key(session_id), json.dumps(settings).encode(), expire=self._ttl
+        )
+
+
+def _make_store():
+    url = os.getenv("ASA_CACHE_URL")
+    if url:
+        return _MemcacheStore(url, SETTINGS_TTL)
+    return _LocalStore(SETTINGS_MAX_SESSIONS, SETTINGS_TTL)
+
+
+_STORE = _make_store()
+
+
+def get_settings(session_id: str) -> Settings:
+    """Return a copy of the settings saved for a session (empty if none)."""
+    return _STORE.get(session_id)
+
+
+def set_settings(session_id: str, settings: Settings) -> None:
+    """Replace the settings saved for a session."""
+    _STORE.set(session_id, settings)
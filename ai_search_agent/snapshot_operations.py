@@ -1,66 +1,259 @@
-import os
+import asyncio
+import logging
+import random
+import statistics
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
 
-import requests
-from dotenv import load_dotenv
+import httpx
+import ijson
+import orjson
 
-load_dotenv()
+from . import http_client
+from .http_client import DEFAULT_TIMEOUT, bd_headers, get_client, new_async_client
+
+log = logging.getLogger(__name__)
+
+# Backoff between progress checks: starts at BASE, grows by FACTOR per
+# "running" reply, capped at CAP, plus up to JITTER seconds of random jitter.
+POLL_BASE_DELAY = 1.0
+POLL_BACKOFF_FACTOR = 1.5
+POLL_MAX_DELAY = 15.0
+POLL_JITTER = 0.5
+# Give up after this many seconds even if attempts remain
+POLL_MAX_WAIT = 300.0
+
+# Recent completion times (seconds) per dataset, used to seed the first delay
+# so datasets that always take minutes don't spend requests polling early.
+_HISTORY_SIZE = 20
+_completion_history: Dict[str, Deque[float]] = defaultdict(
+    lambda: deque(maxlen=_HISTORY_SIZE)
+)
+_history_lock = threading.Lock()
+
+
+def _initial_delay(history_key: str) -> float:
+    with _history_lock:
+        history = list(_completion_history.get(history_key, ()))
+    if not history:
+        return POLL_BASE_DELAY
+    return min(POLL_MAX_DELAY, max(POLL_BASE_DELAY, statistics.median(history) / 4))
+
+
+def _record_completion(history_key: str, elapsed: float) -> None:
+    with _history_lock:
+        _completion_history[history_key].append(elapsed)
+
+
+def _sleep(delay: float) -> None:
+    time.sleep(delay + random.uniform(0, POLL_JITTER))
+
+
+async def _asleep(delay: float) -> None:
+    await asyncio.sleep(delay + random.uniform(0, POLL_JITTER))
+
+
+def _progress_url(snapshot_id: str) -> str:
+    return f"https://api.brightdata.com/datasets/v3/progress/{snapshot_id}"
+
+
+def _handle_status(
+    status: Any, delay: float, history_key: str, started: float
+) -> Tuple[Optional[bool], float, float]:
+    """Interpret one progress reply.
+
+    Returns (result, sleep_for, next_delay); result is None while the
+    snapshot is still pending.
+    """
+    if status == "ready":
+        log.info("✅ Snapshot completed!")
+        _record_completion(history_key, time.monotonic() - started)
+        return True, 0.0, delay
+    if status == "failed":
+        log.error("❌ Snapshot failed")
+        return False, 0.0, delay
+    if status == "running":
+        log.debug("🔄 Still processing...")
+        return None, delay, min(POLL_MAX_DELAY, delay * POLL_BACKOFF_FACTOR)
+    # Unknown or missing status is likely transient: retry soon
+    log.warning("❓ Unknown status: %s", status)
+    return None, POLL_BASE_DELAY, delay
+
+
+def _log_attempt(attempt: int, max_attempts: int) -> None:
+    log.debug(
+        "⏳ Checking snapshot progress... (attempt %s/%s)", attempt + 1, max_attempts
+    )
 
 
 def poll_snapshot_status(
-    snapshot_id: str, max_attempts: int = 60, delay: int = 5, api_key: str | None = None
+    snapshot_id: str,
+    max_attempts: int = 60,
+    api_key: str | None = None,
+    history_key: str = "default",
 ) -> bool:
     """Poll Bright Data snapshot status until ready/failed or timeout.
 
     Args:
         snapshot_id: Snapshot ID returned by Bright Data.
         max_attempts: Max polling attempts before timing out.
-        delay: Seconds to sleep between attempts.
+        history_key: Groups completion times (normally the dataset id) so
+            later polls of the same dataset start at a fitting delay.
 
     Returns:
         True if the snapshot is ready, False otherwise.
     """
-    api_key = api_key or os.getenv("BRIGHTDATA_API_KEY")
-    progress_url = f"https://api.brightdata.com/datasets/v3/progress/{snapshot_id}"
-    headers = {"Authorization": f"Bearer {api_key}"}
+    api_key = api_key or http_client._DEFAULT_BD_KEY
+    headers = bd_headers(api_key)
 
+    started = time.monotonic()
+    delay = _initial_delay(history_key)
     for attempt in range(max_attempts):
+        if time.monotonic() - started > POLL_MAX_WAIT:
+            break
         try:
-            print(
-                (
-                    "⏳ Checking snapshot progress... (attempt "
-                    f"{attempt + 1}/{max_attempts})"
-                )
-            )
-
-            response = requests.get(progress_url, headers=headers)
+            _log_attempt(attempt, max_attempts)
+            response = get_client().get(_progress_url(snapshot_id), headers=headers)
             response.raise_for_status()
+            status = orjson.loads(response.content).get("status")
+        except Exception as e:
+            log.warning("⚠️ Error checking progress: %s", e)
+            _sleep(POLL_BASE_DELAY)
+            continue
+
+        result, sleep_for, delay = _handle_status(status, delay, history_key, started)
+        if result is not None:
+            return result
+        _sleep(sleep_for)
 
-            progress_data = response.json()
-            status = progress_data.get("status")
-
-            if status == "ready":
-                print("✅ Snapshot completed!")
-                return True
-            elif status == "failed":
-                print("❌ Snapshot failed")
-                return False
-            elif status == "running":
-                print("🔄 Still processing...")
-                time.sleep(delay)
-            else:
-                print(f"❓ Unknown status: {status}")
-                time.sleep(delay)
+    log.warning("⏰ Timeout waiting for snapshot completion")
+    return False
+
+
+async def poll_snapshot_status_async(
+    snapshot_id: str,
+    client: httpx.AsyncClient,
+    max_attempts: int = 60,
+    api_key: str | None = None,
+    history_key: str = "default",
+) -> bool:
+    """Async counterpart of poll_snapshot_status using a shared AsyncClient.
 
+    Waiting happens with ``asyncio.sleep`` so many snapshots can be polled
+    from one event loop at once.
+    """
+    api_key = api_key or http_client._DEFAULT_BD_KEY
+    headers = bd_headers(api_key)
+
+    started = time.monotonic()
+    delay = _initial_delay(history_key)
+    for attempt in range(max_attempts):
+        if time.monotonic() - started > POLL_MAX_WAIT:
+            break
+        try:
+            _log_attempt(attempt, max_attempts)
+            response = await client.get(
+                _progress_url(snapshot_id), headers=headers, timeout=DEFAULT_TIMEOUT
+            )
+            response.raise_for_status()
+            status = orjson.loads(response.content).get("status")
         except Exception as e:
-            print(f"⚠️ Error checking progress: {e}")
-            time.sleep(delay)
+            log.warning("⚠️ Error checking progress: %s", e)
+            await _asleep(POLL_BASE_DELAY)
+            continue
+
+        result, sleep_for, delay = _handle_status(status, delay, history_key, started)
+        if result is not None:
+            return result
+        await _asleep(sleep_for)
 
-    print("⏰ Timeout waiting for snapshot completion")
+    log.warning("⏰ Timeout waiting for snapshot completion")
     return False
 
 
+async def wait_many(
+    snapshot_ids: Sequence[str],
+    *,
+    api_key: str | None = None,
+    history_key: str = "default",
+    client: Optional[httpx.AsyncClient] = None,
+) -> List[bool]:
+    """Poll several snapshots concurrently; results follow input order."""
+    if client is None:
+        async with new_async_client() as own_client:
+            return await wait_many(
+                snapshot_ids,
+                api_key=api_key,
+                history_key=history_key,
+                client=own_client,
+            )
+    return list(
+        await asyncio.gather(
+            *(
+                poll_snapshot_status_async(
+                    sid, client, api_key=api_key, history_key=history_key
+                )
+                for sid in snapshot_ids
+            )
+        )
+    )
+
+
+def poll_many(
+    snapshot_ids: Sequence[str],
+    *,
+    api_key: str | None = None,
+    history_key: str = "default",
+) -> List[bool]:
+    """Blocking wrapper around wait_many for synchronous callers."""
+    return asyncio.run(
+        wait_many(snapshot_ids, api_key=api_key, history_key=history_key)
+    )
+
+
+def iter_snapshot(
+    snapshot_id: str, format: str = "json", api_key: str | None = None
+) -> Iterator[Any]:
+    """Yield the records of a completed snapshot as they are parsed.
+
+    Body chunks are pushed into an ijson parser as they arrive, so records
+    reach the caller while the download is still in progress and the full
+    payload is never held in memory. Errors propagate to the caller; a body
+    that is not a JSON array (e.g. a "not ready yet" object) raises ValueError
+    instead of yielding nothing.
+    """
+    api_key = api_key or http_client._DEFAULT_BD_KEY
+    download_url = (
+        f"https://api.brightdata.com/datasets/v3/snapshot/{snapshot_id}?format={format}"
+    )
+    headers = bd_headers(api_key)
+
+    log.info("📥 Downloading snapshot data...")
+    with get_client().stream("GET", download_url, headers=headers) as response:
+        response.raise_for_status()
+        records = ijson.sendable_list()
+        parser = ijson.items_coro(records, "item", use_float=True)
+        checked = False
+        for chunk in response.iter_bytes():
+            if not checked:
+                head = chunk.lstrip()
+                if not head:
+                    continue
+                if head[:1] != b"[":
+                    raise ValueError(
+                        f"Snapshot {snapshot_id} is not a JSON array "
+                        f"(HTTP {response.status_code}): {head[:200]!r}"
+                    )
+                checked = True
+            parser.send(chunk)
+            yield from records
+            del records[:]
+        parser.close()
+        yield from records
+
+
 def download_snapshot(
     snapshot_id: str, format: str = "json", api_key: str | None = None
 ) -> Optional[List[Dict[Any, Any]]]:
@@ -73,28 +266,11 @@ def download_snapshot(
     Returns:
         Parsed JSON list or None on error.
     """
-    api_key = api_key or os.getenv("BRIGHTDATA_API_KEY")
-    download_url = (
-        f"https://api.brightdata.com/datasets/v3/snapshot/{snapshot_id}?format={format}"
-    )
-    headers = {"Authorization": f"Bearer {api_key}"}
-
     try:
-        print("📥 Downloading snapshot data...")
-
-        response = requests.get(download_url, headers=headers)
-        response.raise_for_status()
-
-        data = response.json()
-        print(
-            (
-                "🎉 Successfully downloaded "
-                f"{len(data) if isinstance(data, list) else 1} items"
-            )
-        )
-
+        data = list(iter_snapshot(snapshot_id, format, api_key))
+        log.info("🎉 Successfully downloaded %s items", len(data))
         return data
 
     except Exception as e:
-        print(f"❌ Error downloading snapshot: {e}")
+        log.error("❌ Error downloading snapshot: %s", e)
         return None
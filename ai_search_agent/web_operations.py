@@ -1,39 +1,135 @@
-import os
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from urllib.parse import quote_plus
 
-import requests
-from dotenv import load_dotenv
+import httpx
+import orjson
 
-from .snapshot_operations import download_snapshot, poll_snapshot_status
+from . import http_client
+from .http_client import bd_headers, get_client
+from .snapshot_operations import iter_snapshot, poll_many, poll_snapshot_status
 
-load_dotenv()
+log = logging.getLogger(__name__)
 
 dataset_id = "gd_lvz8ah06191smkebj4"
 
+# SERP target URL per engine; the encoded query fills the placeholder
+_ENGINE_URLS = {
+    "google": "https://www.google.com/search?q={}&brd_json=1",
+    "bing": "https://www.bing.com/search?q={}&brd_json=1",
+}
+_ENGINE_LABELS = {engine: engine.title() for engine in _ENGINE_URLS}
+
+# Interactive sessions often repeat a question across engines and runs
+_quote = lru_cache(maxsize=1024)(quote_plus)
+
+# Responses worth retrying, how often, and the base of the exponential delay
+# used when the server doesn't send Retry-After (capped at RETRY_MAX_DELAY).
+# Every Bright Data POST here is billable (SERP requests, dataset triggers),
+# so only statuses that mean the request was not accepted are retried; a
+# gateway 502/504 may arrive after the job already started.
+_RETRY_STATUSES = frozenset((429, 503))
+STATUS_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_MAX_DELAY = 30.0
+
+# Circuit breaker: after CIRCUIT_THRESHOLD consecutive failed requests, skip
+# Bright Data calls for CIRCUIT_COOLDOWN seconds instead of waiting on
+# timeouts while the service is down.
+CIRCUIT_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30.0
+_circuit_lock = threading.Lock()
+_circuit_failures = 0
+_circuit_open_until = 0.0
+
+# Post URLs sent per comments-dataset trigger; larger lists are split into
+# batches that are triggered and polled concurrently.
+REDDIT_COMMENTS_BATCH = 64
+
+
+def _circuit_open() -> bool:
+    with _circuit_lock:
+        return time.monotonic() < _circuit_open_until
+
+
+def _record_success() -> None:
+    global _circuit_failures
+    with _circuit_lock:
+        _circuit_failures = 0
+
+
+def _record_failure() -> None:
+    global _circuit_failures, _circuit_open_until
+    with _circuit_lock:
+        _circuit_failures += 1
+        if _circuit_failures >= CIRCUIT_THRESHOLD:
+            _circuit_open_until = time.monotonic() + CIRCUIT_COOLDOWN
+            _circuit_failures = 0
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    try:
+        delay = float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        # Missing, or an HTTP-date we don't bother parsing
+        delay = RETRY_BACKOFF * 2**attempt
+    return min(max(delay, 0.0), RETRY_MAX_DELAY)
+
+
+def _post_with_retries(url, headers, **kwargs) -> httpx.Response:
+    for attempt in range(STATUS_RETRIES + 1):
+        response = get_client().post(url, headers=headers, **kwargs)
+        if response.status_code not in _RETRY_STATUSES or attempt == STATUS_RETRIES:
+            return response
+        delay = _retry_delay(response, attempt)
+        log.warning(
+            "🔁 Bright Data returned %s; retrying in %ss", response.status_code, delay
+        )
+        time.sleep(delay)
+    return response
+
 
-def _make_api_request(url, *, api_key: str | None = None, **kwargs):
+def _make_api_request(url, payload=None, *, api_key: str | None = None, **kwargs):
     """Helper to POST to Bright Data API with auth and error handling.
 
     Args:
+        payload: JSON-serializable request body, encoded with orjson.
         api_key: Bright Data API key. Falls back to env if None.
     """
-    api_key = api_key or os.getenv("BRIGHTDATA_API_KEY")
+    if _circuit_open():
+        log.warning("⛔ Bright Data API unavailable; skipping request")
+        return None
 
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
+    api_key = api_key or http_client._DEFAULT_BD_KEY
+
+    headers = bd_headers(api_key, json_body=True)
 
     try:
-        response = requests.post(url, headers=headers, **kwargs)
+        if payload is not None:
+            kwargs["content"] = orjson.dumps(payload)
+        response = _post_with_retries(url, headers, **kwargs)
         response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"API request failed: {e}")
+        result = orjson.loads(response.content)
+    except httpx.HTTPStatusError as e:
+        log.error("API request failed: %s", e)
+        # Other 4xx responses mean a bad request or key, not an outage
+        status = e.response.status_code
+        if status >= 500 or status == 429:
+            _record_failure()
+        return None
+    except httpx.HTTPError as e:
+        log.error("API request failed: %s", e)
+        _record_failure()
         return None
     except Exception as e:
-        print(f"Unknown error: {e}")
+        log.error("Unknown error: %s", e)
         return None
+    _record_success()
+    return result
 
 
 def serp_search(query, engine="google", *, api_key: str | None = None):
@@ -45,23 +141,22 @@ def serp_search(query, engine="google", *, api_key: str | None = None):
     Returns:
         Dict with minimal extracted sections or None on failure.
     """
-    if engine == "google":
-        base_url = "https://www.google.com/search"
-    elif engine == "bing":
-        base_url = "https://www.bing.com/search"
-    else:
-        raise ValueError(f"Unknown engine {engine}")
+    try:
+        template = _ENGINE_URLS[engine]
+    except KeyError:
+        raise ValueError(f"Unknown engine {engine}") from None
+    engine_label = _ENGINE_LABELS[engine]
 
     url = "https://api.brightdata.com/request"
 
     payload = {
         "zone": "ai_agent",
-        "url": f"{base_url}?q={quote_plus(query)}&brd_json=1",
+        "url": template.format(_quote(query)),
         "format": "raw",
     }
 
-    print(f"🌐 SERP: requesting {engine.title()} results…")
-    full_response = _make_api_request(url, json=payload, api_key=api_key)
+    log.info("🌐 SERP: requesting %s results…", engine_label)
+    full_response = _make_api_request(url, payload, api_key=api_key)
     if not full_response:
         return None
 
@@ -69,39 +164,65 @@ def serp_search(query, engine="google", *, api_key: str | None = None):
         "knowledge": full_response.get("knowledge", {}),
         "organic": full_response.get("organic", []),
     }
-    try:
-        print(
-            (
-                "🔎 SERP: got "
-                f"{len(extracted_data['organic'])} organic results from "
-                f"{engine.title()}"
-            )
-        )
-    except Exception:
-        pass
+    log.info(
+        "🔎 SERP: got %s organic results from %s",
+        len(extracted_data["organic"]),
+        engine_label,
+    )
     return extracted_data
 
 
-def _trigger_and_download_snapshot(
+def _dict_records(records, kind):
+    """Return the snapshot records, checking only the first record's type.
+
+    Bright Data returns a uniform array of objects, so one check decides
+    whether the stream can be trusted. If the first record is not a dict,
+    warn once and filter every record.
+    """
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return iter(())
+    if type(first) is dict:
+        return itertools.chain((first,), records)
+    log.warning(
+        "Expected dict records for %s, got %s; filtering", kind, type(first).__name__
+    )
+    return (r for r in records if type(r) is dict)
+
+
+def _trigger_snapshot(
     trigger_url, params, data, *, api_key: str | None = None, operation_name="operation"
 ):
-    """Trigger a Bright Data dataset and download its snapshot when ready."""
-    print(f"🚚 Triggering Bright Data dataset for {operation_name}…")
+    """Trigger a Bright Data dataset and return the snapshot id, or None."""
+    log.info("🚚 Triggering Bright Data dataset for %s…", operation_name)
     trigger_result = _make_api_request(
-        trigger_url, params=params, json=data, api_key=api_key
+        trigger_url, data, params=params, api_key=api_key
     )
     if not trigger_result:
         return None
+    return trigger_result.get("snapshot_id")
 
-    snapshot_id = trigger_result.get("snapshot_id")
+
+def _trigger_and_stream_snapshot(
+    trigger_url, params, data, *, api_key: str | None = None, operation_name="operation"
+):
+    """Trigger a Bright Data dataset and stream its snapshot when ready.
+
+    Returns an iterator over the snapshot records (see ``iter_snapshot``),
+    or None if the trigger or polling failed.
+    """
+    snapshot_id = _trigger_snapshot(
+        trigger_url, params, data, api_key=api_key, operation_name=operation_name
+    )
     if not snapshot_id:
         return None
 
-    if not poll_snapshot_status(snapshot_id, api_key=api_key):
+    history_key = (params or {}).get("dataset_id", operation_name)
+    if not poll_snapshot_status(snapshot_id, api_key=api_key, history_key=history_key):
         return None
 
-    raw_data = download_snapshot(snapshot_id, api_key=api_key)
-    return raw_data
+    return iter_snapshot(snapshot_id, api_key=api_key)
 
 
 def reddit_search_api(
@@ -137,41 +258,23 @@ def reddit_search_api(
         }
     ]
 
-    raw_data = _trigger_and_download_snapshot(
+    records = _trigger_and_stream_snapshot(
         trigger_url, params, data, api_key=api_key, operation_name="reddit"
     )
-
-    if not raw_data:
+    if records is None:
         return None
 
-    # Debug: Print the data shape only
-    print(
-        (
-            "DEBUG: raw_data type: "
-            f"{type(raw_data)}; length: "
-            f"{len(raw_data) if isinstance(raw_data, list) else 'n/a'}"
-        )
-    )
-
-    # Ensure raw_data is a list
-    if not isinstance(raw_data, list):
-        print(
-            f"Warning: Expected list for reddit data, got {type(raw_data)}: {raw_data}"
-        )
-        return {"parsed_posts": [], "total_found": 0}
-
-    parsed_data = []
-    for post in raw_data:
-        # Ensure each post is a dictionary
-        if not isinstance(post, dict):
-            print(f"Warning: Expected dict for post, got {type(post)}: {post}")
-            continue
-
-        parsed_post = {
-            "title": post.get("title", "No title"),
-            "url": post.get("url", "No URL"),
-        }
-        parsed_data.append(parsed_post)
+    try:
+        parsed_data = [
+            {
+                "title": post.get("title", "No title"),
+                "url": post.get("url", "No URL"),
+            }
+            for post in _dict_records(records, "reddit posts")
+        ]
+    except Exception as e:
+        log.error("❌ Error downloading snapshot: %s", e)
+        return None
 
     return {"parsed_posts": parsed_data, "total_found": len(parsed_data)}
 
@@ -209,34 +312,59 @@ def reddit_post_retrieval(
         for url in urls
     ]
 
-    raw_data = _trigger_and_download_snapshot(
-        trigger_url, params, data, api_key=api_key, operation_name="reddit comments"
-    )
-    if not raw_data:
+    batches = [
+        data[i : i + REDDIT_COMMENTS_BATCH]
+        for i in range(0, len(data), REDDIT_COMMENTS_BATCH)
+    ]
+    with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+        snapshot_ids = list(
+            pool.map(
+                lambda batch: _trigger_snapshot(
+                    trigger_url,
+                    params,
+                    batch,
+                    api_key=api_key,
+                    operation_name="reddit comments",
+                ),
+                batches,
+            )
+        )
+    snapshot_ids = [sid for sid in snapshot_ids if sid]
+    if not snapshot_ids:
         return None
 
-    # Ensure raw_data is a list
-    if not isinstance(raw_data, list):
-        print(
-            (
-                "Warning: Expected list for reddit comments data, got "
-                f"{type(raw_data)}: {raw_data}"
+    if len(snapshot_ids) == 1:
+        # A lone batch polls on the shared client; poll_many would start a
+        # new event loop and AsyncClient just to wait on one snapshot.
+        ready = [
+            poll_snapshot_status(
+                snapshot_ids[0], api_key=api_key, history_key=comments_dataset_id
             )
+        ]
+    else:
+        ready = poll_many(
+            snapshot_ids, api_key=api_key, history_key=comments_dataset_id
         )
-        return {"comments": [], "total_retrieved": 0}
-
-    parsed_comments = []
-    for comment in raw_data:
-        # Ensure each comment is a dictionary
-        if not isinstance(comment, dict):
-            print(f"Warning: Expected dict for comment, got {type(comment)}: {comment}")
-            continue
-
-        parsed_comment = {
-            "comment_id": comment.get("comment_id", "No ID"),
-            "content": comment.get("comment", "No content"),
-            "date": comment.get("date_posted", "No date"),
-        }
-        parsed_comments.append(parsed_comment)
+    ready_ids = [sid for sid, ok in zip(snapshot_ids, ready) if ok]
+    if not ready_ids:
+        return None
+
+    # Batches are downloaded in trigger order so comments keep URL order
+    records = itertools.chain.from_iterable(
+        iter_snapshot(sid, api_key=api_key) for sid in ready_ids
+    )
+
+    try:
+        parsed_comments = [
+            {
+                "comment_id": comment.get("comment_id", "No ID"),
+                "content": comment.get("comment", "No content"),
+                "date": comment.get("date_posted", "No date"),
+            }
+            for comment in _dict_records(records, "reddit comments")
+        ]
+    except Exception as e:
+        log.error("❌ Error downloading snapshot: %s", e)
+        return None
 
     return {"comments": parsed_comments, "total_retrieved": len(parsed_comments)}
@@ -89,6 +89,7 @@ export default function App() {
   const [theme, setTheme] = useState<string>(() => localStorage.getItem('asa_theme') || 'system')
   const [isDark, setIsDark] = useState<boolean>(() => document.documentElement.classList.contains('dark'))
   const [runs, setRuns] = useState<Array<{ id: string; ts: number; question: string; has_answer: boolean }>>([])
+  const [runsCursor, setRunsCursor] = useState<{ ts: number; id: string } | null>(null)
   const [srcTab, setSrcTab] = useState<'google' | 'bing' | 'reddit'>('google')
 
   async function submit(e: React.FormEvent) {
@@ -204,12 +205,19 @@ export default function App() {
     }
   }
 
-  async function refreshRuns() {
+  async function refreshRuns(before?: { ts: number; id: string }) {
     try {
-      const r = await fetch('/api/runs')
+      const r = await fetch(
+        before
+          ? `/api/runs?before_ts=${before.ts}&before_id=${encodeURIComponent(before.id)}`
+          : '/api/runs'
+      )
       if (!r.ok) throw new Error(await r.text())
-      const list = await r.json()
-      setRuns(list)
+      const page = await r.json()
+      setRuns(prev => before ? [...prev, ...page.items] : page.items)
+      setRunsCursor(
+        page.next_before_ts != null ? { ts: page.next_before_ts, id: page.next_before_id } : null
+      )
     } catch (e: any) {
       toast.error(e?.message ?? 'Failed to load library')
     }
@@ -304,7 +312,7 @@ export default function App() {
             <motion.section initial={{opacity:0, y:8}} animate={{opacity:1, y:0}} exit={{opacity:0, y:8}} transition={{duration:0.2}} className="card p-6 mt-6 text-slate-900 dark:text-slate-100">
               <div className="flex items-center justify-between mb-2">
                 <h3 className="font-semibold">Library</h3>
-                <button className="btn-outline" onClick={refreshRuns}><RefreshCw className="w-4 h-4 mr-1"/>Refresh</button>
+                <button className="btn-outline" onClick={() => refreshRuns()}><RefreshCw className="w-4 h-4 mr-1"/>Refresh</button>
               </div>
               <div className="max-h-80 overflow-auto divide-y divide-slate-200 dark:divide-slate-700">
                 {runs.length === 0 && <div className="text-sm text-slate-500 py-6">No saved runs yet. Run a query to populate.</div>}
@@ -330,6 +338,11 @@ export default function App() {
                     </div>
                   </div>
                 ))}
+                {runsCursor !== null && (
+                  <div className="py-3 text-center">
+                    <button className="btn-ghost" onClick={() => refreshRuns(runsCursor)}>Load more</button>
+                  </div>
+                )}
               </div>
             </motion.section>
           )}
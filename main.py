@@ -4,10 +4,17 @@ Provides a simple interactive CLI that uses the packaged pipeline.
 For API usage, run: `uvicorn ai_search_agent.api:app --reload`.
 """
 
-from ai_search_agent.pipeline import run_research
+from dotenv import load_dotenv
 
 
 def run_cli() -> None:
+    # Load .env before importing the pipeline so module-level settings see it
+    load_dotenv()
+    from ai_search_agent.cli import configure_logging
+    from ai_search_agent.pipeline import run_research
+
+    configure_logging()
+
     print("Multi-Source Research Agent (CLI)")
     print("Type 'exit' to quit\n")
 
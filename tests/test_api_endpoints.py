@@ -45,7 +45,7 @@ def test_research_sanitizes_non_serializable(monkeypatch):
     # the API filters only allowed, JSON-safe keys.
     from ai_search_agent import api as api_mod
 
-    def fake_run_research(question, config=None, openai_api_key=None):
+    async def fake_run_research(question, config=None, openai_api_key=None):
         class NotJSON:
             pass
 
@@ -64,21 +64,180 @@ def test_research_sanitizes_non_serializable(monkeypatch):
             "reddit_comments_dataset": {"ok": True},
         }
 
-    monkeypatch.setattr(api_mod, "run_research", fake_run_research)
+    monkeypatch.setattr(api_mod, "arun_research", fake_run_research)
     monkeypatch.setattr(api_mod, "preflight_check", fake_preflight)
 
+    # Entering the client runs the app lifespan, which creates the DB schema
+    with TestClient(app) as c:
+        r = c.post(
+            "/api/research",
+            json={
+                "question": "Is TypeScript worth it?",
+                "openai_api_key": "x",
+                "brightdata_api_key": "y",
+                "reddit_dataset_id": "gd_abc",
+                "reddit_comments_dataset_id": "gd_def",
+            },
+        )
+    assert r.status_code == 200
+    data = r.json()
+    assert data["final_answer"] == "It depends"
+    assert "messages" not in data
+
+
+def test_session_cookie_issued_once():
     c = TestClient(app)
-    r = c.post(
+    r = c.get("/health")
+    assert "ASA_SESSION=" in r.headers.get("set-cookie", "")
+    # The client now sends the cookie back; no new session is issued
+    r2 = c.get("/api/settings")
+    assert r2.status_code == 200
+    assert "set-cookie" not in r2.headers
+
+
+def test_settings_persist_per_session():
+    c = TestClient(app)
+    r = c.post("/api/settings", json={"reddit_dataset_id": "gd_abc"})
+    assert r.status_code == 200
+    r = c.post("/api/settings", json={"openai_api_key": "x"})
+    body = r.json()
+    assert body["has_openai_api_key"] is True
+    assert body["reddit_dataset_id"] == "gd_abc"
+    # A fresh client gets a new session with no saved settings
+    assert TestClient(app).get("/api/settings").json()["reddit_dataset_id"] is None
+
+
+def test_research_stream_emits_deltas_and_saves_run(monkeypatch):
+    import json
+
+    from ai_search_agent import api as api_mod
+
+    async def fake_run_analysis(question, config=None, openai_api_key=None):
+        return {"final_answer": None, "google_analysis": "g", "llm": object()}
+
+    async def fake_stream(state):
+        for part in ("It ", "depends"):
+            yield part
+
+    def fake_preflight(**kwargs):
+        return {"ok": True}
+
+    monkeypatch.setattr(api_mod, "arun_analysis", fake_run_analysis)
+    monkeypatch.setattr(api_mod, "astream_synthesis", fake_stream)
+    monkeypatch.setattr(api_mod, "preflight_check", fake_preflight)
+
+    with TestClient(app) as c:
+        r = c.post("/api/research/stream", json={"question": "Is TypeScript worth it?"})
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = [
+            json.loads(line[len("data: ") :])
+            for line in r.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        assert events[0]["result"] == {"google_analysis": "g"}
+        assert [e["delta"] for e in events if "delta" in e] == ["It ", "depends"]
+        assert events[-1]["done"] is True
+
+        run = c.get(f"/api/runs/{events[-1]['run_id']}").json()
+        assert run["result"]["final_answer"] == "It depends"
+
+
+def test_research_stream_reports_synthesis_error(monkeypatch):
+    import json
+
+    from ai_search_agent import api as api_mod
+
+    async def fake_run_analysis(question, config=None, openai_api_key=None):
+        return {"final_answer": None, "google_analysis": "g", "llm": object()}
+
+    async def failing_stream(state):
+        yield "It "
+        raise RuntimeError("LLM went away")
+
+    saved = []
+    monkeypatch.setattr(api_mod, "arun_analysis", fake_run_analysis)
+    monkeypatch.setattr(api_mod, "astream_synthesis", failing_stream)
+    monkeypatch.setattr(api_mod, "preflight_check", lambda **kw: {"ok": True})
+    monkeypatch.setattr(api_mod, "db_save_run", lambda *args: saved.append(args))
+
+    with TestClient(app) as c:
+        r = c.post("/api/research/stream", json={"question": "Is TypeScript worth it?"})
+        events = [
+            json.loads(line[len("data: ") :])
+            for line in r.text.splitlines()
+            if line.startswith("data: ")
+        ]
+    assert events[-1]["error"] == "LLM went away"
+    assert not any("done" in e for e in events)
+    ((_, run_id, _, blob, has_answer),) = saved
+    assert run_id == events[-1]["run_id"]
+    assert has_answer is False
+    assert "final_answer" not in json.loads(blob)
+
+
+def test_preflight_failure_is_400_on_both_research_endpoints(monkeypatch):
+    from ai_search_agent import api as api_mod
+
+    monkeypatch.setattr(
+        api_mod,
+        "preflight_check",
+        lambda **kw: {
+            "ok": False,
+            "openai": {"ok": False, "message": "bad key"},
+            "brightdata_api": {"ok": True},
+            "reddit_dataset": {"ok": True},
+            "reddit_comments_dataset": {"ok": True},
+        },
+    )
+    with TestClient(app) as c:
+        for path in ("/api/research", "/api/research/stream"):
+            r = c.post(path, json={"question": "q"})
+            assert r.status_code == 400, path
+            assert r.json()["detail"] == "Preflight failed: openai: bad key"
+
+
+def test_cors_preflight_is_cacheable():
+    c = TestClient(app)
+    r = c.options(
         "/api/research",
-        json={
-            "question": "Is TypeScript worth it?",
-            "openai_api_key": "x",
-            "brightdata_api_key": "y",
-            "reddit_dataset_id": "gd_abc",
-            "reddit_comments_dataset_id": "gd_def",
+        headers={
+            "Origin": "http://localhost:5173",
+            "Access-Control-Request-Method": "POST",
         },
     )
     assert r.status_code == 200
-    data = r.json()
-    assert data["final_answer"] == "It depends"
-    assert "messages" not in data
+    assert r.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert r.headers["access-control-max-age"] == "86400"
+
+
+def test_list_runs_returns_page():
+    with TestClient(app) as c:
+        r = c.get("/api/runs", params={"limit": 5})
+        assert r.status_code == 200
+        assert r.json() == {
+            "items": [],
+            "next_before_ts": None,
+            "next_before_id": None,
+        }
+        assert c.get("/api/runs", params={"limit": 0}).status_code == 422
+
+
+def test_lifespan_prints_package_logs_once(monkeypatch):
+    import logging
+
+    pkg = logging.getLogger("ai_search_agent")
+    monkeypatch.setattr(pkg, "level", pkg.level)
+    monkeypatch.setattr(pkg, "handlers", [])
+    monkeypatch.setattr(logging.getLogger(), "handlers", [])
+    for _ in range(2):
+        with TestClient(app):
+            pass
+    assert len(pkg.handlers) == 1
+
+    # A host logging config takes precedence over the default handler
+    monkeypatch.setattr(pkg, "handlers", [])
+    monkeypatch.setattr(logging.getLogger(), "handlers", [logging.NullHandler()])
+    with TestClient(app):
+        pass
+    assert pkg.handlers == []
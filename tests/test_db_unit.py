@@ -0,0 +1,118 @@
+import pytest
+
+import ai_search_agent.db as db
+
+
+@pytest.fixture()
+def fresh_db(tmp_path, monkeypatch):
+    # Point the shared connection at a throwaway database file
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setattr(db, "_CONN", None)
+    db.init_db()
+    yield db
+    db._CONN.close()
+
+
+def test_save_and_get_run_roundtrip(fresh_db):
+    fresh_db.save_run("s1", "r1", "What is X?", b'{"final_answer": "X"}', True)
+    run = fresh_db.get_run("s1", "r1")
+    assert run["question"] == "What is X?"
+    assert run["result"] == {"final_answer": "X"}
+    # Runs are scoped to their session
+    assert fresh_db.get_run("s2", "r1") is None
+
+
+def test_list_runs_and_share(fresh_db):
+    fresh_db.save_run("s1", "r1", "q1", b'{"final_answer": "a"}', True)
+    fresh_db.save_run("s1", "r2", "q2", b"{}", False)
+    metas = {m["id"]: m for m in fresh_db.list_runs("s1")}
+    assert metas["r1"]["has_answer"] is True
+    assert metas["r2"]["has_answer"] is False
+
+    fresh_db.create_share("r1", "sh1")
+    assert fresh_db.get_shared("sh1")["id"] == "r1"
+
+    fresh_db.clear_runs("s1")
+    assert fresh_db.list_runs("s1") == []
+
+
+def test_list_runs_uses_session_index(fresh_db):
+    plan = fresh_db._CONN.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM runs WHERE session_id = ? "
+        "ORDER BY ts DESC, id DESC",
+        ("s1",),
+    ).fetchall()
+    assert any("idx_runs_sid_ts_id" in row["detail"] for row in plan)
+
+
+def test_has_answer_backfilled_for_legacy_rows(tmp_path, monkeypatch):
+    import sqlite3
+
+    path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(path)
+    legacy.execute(
+        "CREATE TABLE runs (id TEXT PRIMARY KEY, session_id TEXT NOT NULL, "
+        "ts INTEGER NOT NULL, question TEXT NOT NULL, result TEXT NOT NULL)"
+    )
+    legacy.executemany(
+        "INSERT INTO runs VALUES (?, ?, ?, ?, ?)",
+        [
+            ("r1", "s1", 1, "q1", '{"final_answer": "yes"}'),
+            ("r2", "s1", 2, "q2", '{"final_answer": ""}'),
+        ],
+    )
+    legacy.commit()
+    legacy.close()
+
+    monkeypatch.setattr(db, "DB_PATH", str(path))
+    monkeypatch.setattr(db, "_CONN", None)
+    db.init_db()
+    try:
+        metas = {m["id"]: m["has_answer"] for m in db.list_runs("s1")}
+        assert metas == {"r1": True, "r2": False}
+    finally:
+        db._CONN.close()
+
+
+def test_results_are_compressed_and_legacy_text_still_reads(fresh_db):
+    fresh_db.save_run("s1", "r1", "q1", b'{"final_answer": "a"}', True)
+    raw = fresh_db._CONN.execute("SELECT result FROM runs WHERE id = 'r1'").fetchone()
+    assert raw["result"].startswith(fresh_db._ZSTD_MAGIC)
+    assert fresh_db.get_run("s1", "r1")["result"] == {"final_answer": "a"}
+
+    # Rows written before compression hold plain JSON text
+    fresh_db._CONN.execute(
+        "INSERT INTO runs (id, session_id, ts, question, result) "
+        "VALUES ('r0', 's1', 0, 'old', '{\"final_answer\": \"b\"}')"
+    )
+    assert fresh_db.get_run("s1", "r0")["result"] == {"final_answer": "b"}
+
+
+def test_list_runs_keyset_pagination(fresh_db):
+    for i in range(5):
+        fresh_db._CONN.execute(
+            "INSERT INTO runs (id, session_id, ts, question, result) "
+            "VALUES (?, 's1', ?, 'q', '{}')",
+            (f"r{i}", 100 + i),
+        )
+    first = fresh_db.list_runs("s1", limit=2)
+    assert [r["id"] for r in first] == ["r4", "r3"]
+    second = fresh_db.list_runs(
+        "s1", before_ts=first[-1]["ts"], before_id=first[-1]["id"], limit=2
+    )
+    assert [r["id"] for r in second] == ["r2", "r1"]
+
+
+def test_list_runs_pages_through_shared_timestamps(fresh_db):
+    for i in range(3):
+        fresh_db._CONN.execute(
+            "INSERT INTO runs (id, session_id, ts, question, result) "
+            "VALUES (?, 's1', 100, 'q', '{}')",
+            (f"r{i}",),
+        )
+    first = fresh_db.list_runs("s1", limit=2)
+    assert [r["id"] for r in first] == ["r2", "r1"]
+    second = fresh_db.list_runs(
+        "s1", before_ts=first[-1]["ts"], before_id=first[-1]["id"], limit=2
+    )
+    assert [r["id"] for r in second] == ["r0"]
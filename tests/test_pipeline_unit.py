@@ -1,9 +1,12 @@
 from types import SimpleNamespace
 
+from cachetools import TTLCache
+
 import ai_search_agent.pipeline as pipeline
 
 
 def test_run_research_happy_path(monkeypatch):
+    monkeypatch.setattr(pipeline, "_RESULT_CACHE", TTLCache(maxsize=8, ttl=60))
     # Stub web operations
     monkeypatch.setattr(
         pipeline,
@@ -30,7 +33,7 @@ def test_run_research_happy_path(monkeypatch):
         def __init__(self, content):
             self.content = content
 
-    def fake_invoke(messages):
+    async def fake_invoke(messages):
         # For URL analysis structured output
         if (
             isinstance(messages, list)
@@ -41,16 +44,131 @@ def test_run_research_happy_path(monkeypatch):
             return FakeResp("analysis")
         return FakeResp("analysis")
 
-    # For structured output call in analyze_reddit_posts
+    # For structured output calls in analyze_reddit_posts and analyze_all
     class FakeStructured:
-        def invoke(self, messages):
+        def __init__(self, schema):
+            self.schema = schema
+
+        async def ainvoke(self, messages):
+            if self.schema is pipeline.ThreeWayAnalysis:
+                return pipeline.ThreeWayAnalysis(
+                    google_analysis="g", bing_analysis="b", reddit_analysis="r"
+                )
             return SimpleNamespace(selected_urls=["https://r/test"])
 
     fake_llm = SimpleNamespace(
-        invoke=fake_invoke, with_structured_output=lambda schema: FakeStructured()
+        ainvoke=fake_invoke, with_structured_output=FakeStructured
     )
     out = pipeline.run_research("test question", llm_override=fake_llm)
     assert out.get("final_answer")
     assert out.get("google_results")["engine"] == "google"
     assert out.get("bing_results")["engine"] == "bing"
     assert out.get("reddit_results")["parsed_posts"]
+    assert out.get("reddit_post_data")["total_retrieved"] == 1
+    assert out.get("google_analysis") == "g"
+    assert out.get("reddit_analysis") == "r"
+
+
+def test_run_research_serves_repeat_questions_from_cache(monkeypatch):
+    monkeypatch.setattr(pipeline, "_RESULT_CACHE", TTLCache(maxsize=8, ttl=60))
+    calls = []
+
+    def fake_serp(q, engine="google", api_key=None):
+        calls.append(engine)
+        return {"organic": []}
+
+    async def fake_ainvoke(messages):
+        return SimpleNamespace(content="answer")
+
+    class FakeStructured:
+        def __init__(self, schema):
+            self.schema = schema
+
+        async def ainvoke(self, messages):
+            return pipeline.ThreeWayAnalysis(
+                google_analysis="g", bing_analysis="b", reddit_analysis="r"
+            )
+
+    monkeypatch.setattr(pipeline, "serp_search", fake_serp)
+    monkeypatch.setattr(
+        pipeline, "reddit_search_api", lambda **kw: {"parsed_posts": []}
+    )
+    fake_llm = SimpleNamespace(
+        ainvoke=fake_ainvoke, with_structured_output=FakeStructured
+    )
+
+    first = pipeline.run_research("What is X?", llm_override=fake_llm)
+    second = pipeline.run_research("  what is x? ", llm_override=fake_llm)
+    assert second["final_answer"] == first["final_answer"] == "answer"
+    assert sorted(calls) == ["bing", "google"]
+    # A different config is a different cache entry
+    pipeline.run_research(
+        "What is X?", {"reddit_dataset_id": "gd_x"}, llm_override=fake_llm
+    )
+    assert len(calls) == 4
+
+
+def test_run_research_does_not_cache_failed_sources(monkeypatch):
+    monkeypatch.setattr(pipeline, "_RESULT_CACHE", TTLCache(maxsize=8, ttl=60))
+    calls = []
+
+    def flaky_serp(q, engine="google", api_key=None):
+        calls.append(engine)
+        # Bing times out / hits the open circuit breaker
+        return None if engine == "bing" else {"organic": []}
+
+    async def fake_ainvoke(messages):
+        return SimpleNamespace(content="answer")
+
+    class FakeStructured:
+        def __init__(self, schema):
+            self.schema = schema
+
+        async def ainvoke(self, messages):
+            return pipeline.ThreeWayAnalysis(
+                google_analysis="g", bing_analysis="b", reddit_analysis="r"
+            )
+
+    monkeypatch.setattr(pipeline, "serp_search", flaky_serp)
+    monkeypatch.setattr(
+        pipeline, "reddit_search_api", lambda **kw: {"parsed_posts": []}
+    )
+    fake_llm = SimpleNamespace(
+        ainvoke=fake_ainvoke, with_structured_output=FakeStructured
+    )
+
+    assert pipeline.run_research("What is X?", llm_override=fake_llm)["final_answer"]
+    pipeline.run_research("What is X?", llm_override=fake_llm)
+    assert len(calls) == 4
+    assert len(pipeline._RESULT_CACHE) == 0
+
+
+def test_retrieve_reddit_posts_makes_one_deduped_call(monkeypatch):
+    import asyncio
+
+    calls = []
+
+    def fake_retrieval(urls, api_key=None, comments_dataset_id=None):
+        calls.append(urls)
+        return {"comments": [{"content": "Nice"}]}
+
+    monkeypatch.setattr(pipeline, "reddit_post_retrieval", fake_retrieval)
+    state = {"selected_reddit_urls": ["https://r/a", "https://r/b", "https://r/a"]}
+    out = asyncio.run(pipeline.retrieve_reddit_posts(state))
+    assert calls == [["https://r/a", "https://r/b"]]
+    assert out["reddit_post_data"]["total_retrieved"] == 1
+
+
+def test_bright_data_calls_use_dedicated_pool(monkeypatch):
+    import asyncio
+    import threading
+
+    threads = []
+
+    def fake_retrieval(urls, api_key=None, comments_dataset_id=None):
+        threads.append(threading.current_thread().name)
+        return {"comments": []}
+
+    monkeypatch.setattr(pipeline, "reddit_post_retrieval", fake_retrieval)
+    asyncio.run(pipeline.retrieve_reddit_posts({"selected_reddit_urls": ["u"]}))
+    assert threads[0].startswith("brightdata")
@@ -1,7 +1,62 @@
+import pytest
+from cachetools import TTLCache
+
+import ai_search_agent.preflight as preflight
 from ai_search_agent.preflight import check_brightdata_dataset_exists
 
 
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(preflight, "_preflight_cache", TTLCache(maxsize=8, ttl=300))
+
+
 def test_dataset_format_check():
     # Does not call network; validates simple format logic
     assert check_brightdata_dataset_exists("tok", "gd_123")["ok"] is True
     assert check_brightdata_dataset_exists("tok", "not_gd")["ok"] is False
+
+
+def test_network_checks_share_async_client(fresh_cache):
+    import asyncio
+
+    import httpx
+
+    from ai_search_agent.preflight import check_brightdata_token, check_openai
+
+    def handler(request):
+        if request.url.host == "api.openai.com":
+            return httpx.Response(200, json={"data": [{"id": "gpt-4o"}]})
+        return httpx.Response(401)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as c:
+            return await asyncio.gather(
+                check_openai(c, "sk-x"), check_brightdata_token(c, "bad")
+            )
+
+    r_openai, r_bright = asyncio.run(run())
+    assert r_openai["ok"] is True
+    assert r_bright == {"ok": False, "message": "Bright Data check failed (401)"}
+
+
+def test_only_successful_checks_are_cached(fresh_cache):
+    import asyncio
+
+    import httpx
+
+    calls = []
+
+    def handler(request):
+        calls.append(request.headers["Authorization"])
+        ok = request.headers["Authorization"] == "Bearer good"
+        return httpx.Response(200 if ok else 401, json={"data": []})
+
+    async def run(key):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as c:
+            return await preflight.check_openai(c, key)
+
+    for _ in range(2):
+        assert asyncio.run(run("good"))["ok"] is True
+        assert asyncio.run(run("bad"))["ok"] is False
+    assert calls == ["Bearer good", "Bearer bad", "Bearer bad"]
+    assert all("good" not in k for k in preflight._preflight_cache)
@@ -13,3 +13,12 @@ def test_reddit_url_analysis_messages_shape():
     msgs = P.get_reddit_url_analysis_messages("Why Y?", {"parsed_posts": []})
     assert len(msgs) == 2
     assert all("content" in m for m in msgs)
+
+
+def test_combined_analysis_messages_cover_all_sources():
+    msgs = P.get_combined_analysis_messages(
+        "Q?", {"organic": []}, {"organic": []}, {"parsed_posts": []}, []
+    )
+    assert len(msgs) == 2
+    for header in ("## Google", "## Bing", "## Reddit"):
+        assert header in msgs[1]["content"]
@@ -0,0 +1,133 @@
+import orjson
+
+import ai_search_agent.snapshot_operations as snap
+
+
+class _Resp:
+    def __init__(self, status):
+        self.content = orjson.dumps({"status": status})
+
+    def raise_for_status(self):
+        pass
+
+
+class _Session:
+    def __init__(self, statuses):
+        self._statuses = iter(statuses)
+
+    def get(self, url, **kwargs):
+        return _Resp(next(self._statuses))
+
+
+def _patch(monkeypatch, statuses):
+    sleeps = []
+    session = _Session(statuses)
+    monkeypatch.setattr(snap, "get_client", lambda: session)
+    monkeypatch.setattr(snap, "_sleep", sleeps.append)
+    monkeypatch.setattr(snap, "_completion_history", snap.defaultdict(snap.deque))
+    return sleeps
+
+
+def test_poll_backs_off_and_retries_unknown_quickly(monkeypatch):
+    sleeps = _patch(monkeypatch, ["running", "running", "starting", "running", "ready"])
+    assert snap.poll_snapshot_status("s_1", api_key="k", history_key="gd_x")
+    assert sleeps == [1.0, 1.5, snap.POLL_BASE_DELAY, 2.25]
+    assert len(snap._completion_history["gd_x"]) == 1
+
+
+def test_poll_seeds_delay_from_history(monkeypatch):
+    sleeps = _patch(monkeypatch, ["running", "failed"])
+    snap._completion_history["gd_x"].extend([40.0, 48.0, 100.0])
+    assert not snap.poll_snapshot_status("s_1", api_key="k", history_key="gd_x")
+    assert sleeps == [12.0]
+
+
+def test_wait_many_polls_concurrently(monkeypatch):
+    import asyncio
+
+    import httpx
+
+    async def no_sleep(delay):
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(snap, "_asleep", no_sleep)
+    monkeypatch.setattr(snap, "_completion_history", snap.defaultdict(snap.deque))
+    replies = {"s_a": iter(["running", "ready"]), "s_b": iter(["failed"])}
+
+    def handler(request):
+        sid = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={"status": next(replies[sid])})
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await snap.wait_many(["s_a", "s_b"], api_key="k", client=client)
+
+    assert asyncio.run(run()) == [True, False]
+
+
+def test_iter_snapshot_streams_records(monkeypatch):
+    import httpx
+
+    body = b'[{"title": "a", "score": 1.5}, {"title": "b"}]'
+
+    def handler(request):
+        # Split the body mid-record to exercise incremental parsing
+        return httpx.Response(200, content=iter([body[:12], body[12:]]))
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(snap, "get_client", lambda: client)
+    records = snap.iter_snapshot("s_1", api_key="k")
+    assert next(records) == {"title": "a", "score": 1.5}
+    assert list(records) == [{"title": "b"}]
+
+
+def test_default_key_read_once_and_refreshable(monkeypatch):
+    from ai_search_agent import http_client
+
+    seen = []
+
+    class _KeySession:
+        def get(self, url, headers=None, **kwargs):
+            seen.append(headers["Authorization"])
+            return _Resp("failed")
+
+    monkeypatch.setattr(snap, "get_client", lambda: _KeySession())
+    monkeypatch.setattr(http_client, "_DEFAULT_BD_KEY", "old")
+    monkeypatch.setenv("BRIGHTDATA_API_KEY", "new")
+    snap.poll_snapshot_status("s_1")
+    http_client._refresh_env()
+    snap.poll_snapshot_status("s_1")
+    assert seen == ["Bearer old", "Bearer new"]
+
+
+def test_poll_many_uses_shared_async_client_settings(monkeypatch):
+    import httpx
+
+    made = []
+
+    def fake_new_async_client():
+        client = httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, json={"status": "ready"})
+            )
+        )
+        made.append(client)
+        return client
+
+    monkeypatch.setattr(snap, "new_async_client", fake_new_async_client)
+    monkeypatch.setattr(snap, "_completion_history", snap.defaultdict(snap.deque))
+    assert snap.poll_many(["s_a", "s_b"], api_key="k") == [True, True]
+    assert len(made) == 1
+
+
+def test_new_async_client_is_an_async_client():
+    import asyncio
+
+    from ai_search_agent.http_client import DEFAULT_TIMEOUT, new_async_client
+
+    async def check():
+        async with new_async_client() as client:
+            return client.timeout.read
+
+    assert asyncio.run(check()) == DEFAULT_TIMEOUT
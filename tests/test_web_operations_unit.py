@@ -0,0 +1,170 @@
+import ai_search_agent.web_operations as wo
+
+
+def test_reddit_post_retrieval_batches_triggers(monkeypatch):
+    triggered = []
+
+    def fake_request(url, payload=None, *, params=None, api_key=None):
+        sid = f"s_{payload[0]['url']}"
+        triggered.append((sid, len(payload)))
+        return {"snapshot_id": sid}
+
+    def fake_iter(sid, api_key=None):
+        yield {"comment_id": sid, "comment": "hi", "date_posted": "d"}
+
+    monkeypatch.setattr(wo, "_make_api_request", fake_request)
+    monkeypatch.setattr(wo, "poll_many", lambda ids, **kw: [i != "s_64" for i in ids])
+    monkeypatch.setattr(wo, "iter_snapshot", fake_iter)
+
+    urls = [str(i) for i in range(130)]
+    out = wo.reddit_post_retrieval(urls, api_key="k", comments_dataset_id="gd_c")
+
+    assert sorted(triggered) == [("s_0", 64), ("s_128", 2), ("s_64", 64)]
+    # The batch whose snapshot failed is skipped; the rest keep trigger order
+    assert [c["comment_id"] for c in out["comments"]] == ["s_0", "s_128"]
+
+
+def test_reddit_post_retrieval_single_batch_polls_on_shared_client(monkeypatch):
+    polled = []
+
+    def fake_poll(sid, api_key=None, history_key="default"):
+        polled.append((sid, history_key))
+        return True
+
+    def no_poll_many(ids, **kw):
+        raise AssertionError("poll_many used for a single batch")
+
+    monkeypatch.setattr(wo, "_make_api_request", lambda *a, **kw: {"snapshot_id": "s"})
+    monkeypatch.setattr(wo, "poll_snapshot_status", fake_poll)
+    monkeypatch.setattr(wo, "poll_many", no_poll_many)
+    monkeypatch.setattr(
+        wo, "iter_snapshot", lambda sid, api_key=None: iter([{"comment_id": "c"}])
+    )
+
+    out = wo.reddit_post_retrieval(["u"], api_key="k", comments_dataset_id="gd_c")
+    assert polled == [("s", "gd_c")]
+    assert out["total_retrieved"] == 1
+
+
+def test_serp_search_builds_engine_url(monkeypatch):
+    import pytest
+
+    sent = []
+    monkeypatch.setattr(
+        wo,
+        "_make_api_request",
+        lambda url, payload, api_key=None: sent.append(payload) or {"organic": []},
+    )
+    assert wo.serp_search("a b&c", "bing", api_key="k") == {
+        "knowledge": {},
+        "organic": [],
+    }
+    assert sent[0]["url"] == "https://www.bing.com/search?q=a+b%26c&brd_json=1"
+    with pytest.raises(ValueError):
+        wo.serp_search("q", "yahoo")
+
+
+def _mock_client(monkeypatch, handler):
+    import httpx
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(wo, "get_client", lambda: client)
+    monkeypatch.setattr(wo, "_circuit_failures", 0)
+    monkeypatch.setattr(wo, "_circuit_open_until", 0.0)
+
+
+def test_make_api_request_retries_retryable_status(monkeypatch):
+    import httpx
+
+    replies = iter(
+        [
+            httpx.Response(429, headers={"Retry-After": "2"}),
+            httpx.Response(503),
+            httpx.Response(200, json={"snapshot_id": "s_1"}),
+        ]
+    )
+    sleeps = []
+    _mock_client(monkeypatch, lambda request: next(replies))
+    monkeypatch.setattr(wo.time, "sleep", sleeps.append)
+
+    assert wo._make_api_request("https://x", {"a": 1}, api_key="k") == {
+        "snapshot_id": "s_1"
+    }
+    assert sleeps == [2.0, 1.0]
+
+
+def test_circuit_opens_after_repeated_failures(monkeypatch):
+    import httpx
+
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectError("down")
+
+    _mock_client(monkeypatch, handler)
+    for _ in range(wo.CIRCUIT_THRESHOLD + 2):
+        assert wo._make_api_request("https://x", api_key="k") is None
+    assert len(calls) == wo.CIRCUIT_THRESHOLD
+
+
+def test_dict_records_checks_first_record_only():
+    assert list(wo._dict_records([], "x")) == []
+    assert list(wo._dict_records([{"a": 1}, {"b": 2}], "x")) == [{"a": 1}, {"b": 2}]
+    assert list(wo._dict_records(["err", {"a": 1}, 3], "x")) == [{"a": 1}]
+
+
+def test_bd_headers_cached_per_key():
+    import pytest
+
+    from ai_search_agent.http_client import bd_headers
+
+    h = bd_headers("k1", json_body=True)
+    assert h is bd_headers("k1", json_body=True)
+    assert h["Authorization"] == "Bearer k1"
+    assert h["Content-Type"] == "application/json"
+    assert "Content-Type" not in bd_headers("k1")
+    with pytest.raises(TypeError):
+        h["Authorization"] = "Bearer other"
+
+
+def test_gateway_errors_are_not_retried(monkeypatch):
+    import httpx
+
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(504)
+
+    _mock_client(monkeypatch, handler)
+    monkeypatch.setattr(wo.time, "sleep", lambda s: None)
+    assert wo._make_api_request("https://x", {"a": 1}, api_key="k") is None
+    assert len(calls) == 1
+    assert wo._circuit_failures == 1
+
+
+def test_package_logs_propagate_to_host_logging(caplog):
+    import logging
+
+    with caplog.at_level(logging.INFO):
+        wo.log.info("🌐 SERP: requesting %s results…", "Google")
+    assert caplog.messages == ["🌐 SERP: requesting Google results…"]
+    assert logging.getLogger("ai_search_agent").propagate is True
+
+
+def test_reddit_search_rejects_non_array_snapshot(monkeypatch):
+    import httpx
+
+    import ai_search_agent.snapshot_operations as snap
+
+    def handler(request):
+        return httpx.Response(202, json={"message": "Snapshot is not ready yet"})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(snap, "get_client", lambda: client)
+    monkeypatch.setattr(wo, "_trigger_snapshot", lambda *a, **kw: "s_1")
+    monkeypatch.setattr(wo, "poll_snapshot_status", lambda *a, **kw: True)
+
+    # An object body must fail the search, not pass as "no posts found"
+    assert wo.reddit_search_api("q", api_key="k", dataset_id="gd_p") is None